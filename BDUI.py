@@ -1,9 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
+import argparse
 import csv
 import os
 import datetime
-from collections import Counter
+import bisect
+import calendar
+import gc
+import gzip
+import heapq
+import json
+import random
+import re
+import smtplib
+import mmap
+import multiprocessing
+import pickle
+import queue
+import struct
+import threading
+import urllib.request
+import uuid
+import zlib
+from array import array
+from collections import Counter, deque
+from contextlib import contextmanager
+from email.message import EmailMessage
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from itertools import chain, compress, islice
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
@@ -15,17 +44,90 @@ except Exception:
     PIL_AVAILABLE = False
 
 try:
+    from reportlab import rl_config
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
     from reportlab.pdfgen import canvas
+    rl_config.useA85 = 0   # store PDF streams as binary instead of ASCII85 text
     REPORTLAB_AVAILABLE = True
 except Exception:
     REPORTLAB_AVAILABLE = False
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
 # ----------------- Configuration / Files -----------------
 STAFF_FILE = "staff.csv"
 APPT_FILE = "appointments.csv"
 BILL_FILE = "bills.csv"
+STAFF_ROLLUP_FILE = "staff_rollups.json"
+DISCOUNT_RULES_FILE = "discount_rules.json"
+RECURRING_FILE = "recurring.json"
+BRANCHES_FILE = "branches.json"
+SYNC_DIR = "sync"
+BILL_HEADERS = ["ID","Name","Staff","Services","Total","Discount","Final","Date"]
+APPT_HEADERS = ["ID","Name","Services","Date","Time","Staff"]
+
+# Closed months are moved out of the CSVs into compressed per-month segments
+ARCHIVE_DIR = "archive"
+# months kept in the hot CSVs, including the current one; the previous month stays hot so that its
+# unbilled, to-be-rescheduled or cancelled appointments remain in Billing, Bulk Checkout and Appointments
+ARCHIVE_KEEP_MONTHS = 2
+
+# Bitmap indexes over the whole bill ledger (see BillIndex)
+BILL_INDEX_FILE = "bills.idx"
+BILL_INDEX_VERSION = 2   # 2: rebuilt after typed columns with bad values were misaligned
+AMOUNT_BUCKETS = (0, 100, 200, 300, 500, 1000, 2000, 5000)   # lower edges of the Final buckets (Rs)
+
+# Invoice logo is embedded once per PDF at this resolution / JPEG quality
+INVOICE_LOGO_DPI = 72
+INVOICE_LOGO_QUALITY = 75
+
+# Opening hours and time budget used by the day planner
+DAY_OPEN = "09:00"
+DAY_CLOSE = "21:00"
+PLANNER_TIME_LIMIT = 0.5   # seconds
+
+# Dashboard repaint is delayed this long so bursts of events share one redraw
+DASHBOARD_REDRAW_MS = 250
+
+# Recurring series are expanded only for this many days ahead in the appointment and billing lists
+RECURRING_VIEW_DAYS = 14
+RECURRING_FREQUENCIES = {"Weekly": ("weekly", 1), "Every 2 weeks": ("weekly", 2), "Monthly": ("monthly", 1)}
+
+# Reminders: minutes before each appointment, how far ahead they are kept in memory, and the spool folder
+REMINDER_LEADS = (24 * 60, 120)
+REMINDER_WINDOW_DAYS = 2
+REMINDER_TICK_MS = 30000
+REMINDER_RETRY_MINUTES = 5
+OUTBOX_DIR = "outbox"
+
+# Delta sync between terminals: HTTP port, and appointment ids are spread over terminals modulo the stride
+SYNC_PORT = 8765
+SYNC_ID_STRIDE = 100
+SYNC_CHECKPOINT_CHANGES = 10000   # changes logged between checkpoints of the derived record versions
+
+# Walk-in queue: priority levels served in this order, and how often the board re-reads the clock
+WALKIN_LEVELS = ("Priority", "Normal")
+WALKIN_BOARD_TICK_MS = 30000
+
+# Occupancy cube: slot length, cache folder for archived months, and the forecast look-back
+SLOT_MINUTES = 15
+OCCUPANCY_DIR = "occupancy"
+OCCUPANCY_VERSION = 1
+OCCUPANCY_FORECAST_WEEKS = 8
+OCCUPANCY_FORECAST_DECAY = 0.8   # weight of each older week relative to the next one
+
+# Binary snapshots kept next to each CSV for fast startup
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_MAGIC = b"BDSNAP"
+SNAPSHOT_VERSION = 1
+# magic, version, csv size, csv mtime (ns), payload crc32, payload length
+SNAPSHOT_HEADER = struct.Struct("<6sHQqIQ")
 
 # Use uploaded logo (developer-provided file)
 LOGO_PATH = "D:/New folder/Salon_Management_System/logo.png"
@@ -60,6 +162,88 @@ service_duration = {
     "Massage": 60
 }
 
+# ----------------- Events -----------------
+# Frames subscribe to data changes instead of rescanning the CSV files.
+#   appointment_added / appointment_updated / appointment_removed (appt)
+#   appointments_reloaded (), staff_changed (), bill_saved (bill row dict)
+#   bills_saved (list of the row dicts just appended, after their bill_saved events)
+#   walkins_changed (), recurring_changed ()
+# Handlers that record local edits check sync_applying(), so changes that
+# arrived from another terminal are not logged again as local ones.
+_listeners = {}
+
+def subscribe(event, callback):
+    _listeners.setdefault(event, []).append(callback)
+
+def publish(event, *args):
+    for callback in list(_listeners.get(event, [])):
+        callback(*args)
+
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic GC while building many small acyclic containers."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+# ----------------- Snapshots -----------------
+# The CSVs stay the source of truth. Each one gets a pickled copy of its parsed
+# rows, stamped with the CSV's size and mtime, so startup can skip parsing.
+_snapshot_lock = threading.Lock()
+
+def read_snapshot(csv_path):
+    """Return the rows cached for csv_path, or None if the snapshot is missing or stale."""
+    try:
+        st = os.stat(csv_path)
+        with open(csv_path + SNAPSHOT_SUFFIX, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, size, mtime_ns, crc, length = SNAPSHOT_HEADER.unpack_from(mm, 0)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    return None
+                if size != st.st_size or mtime_ns != st.st_mtime_ns:
+                    return None
+                payload = memoryview(mm)[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + length]
+                try:
+                    if len(payload) != length or zlib.crc32(payload) != crc:
+                        return None
+                    # the cyclic GC would otherwise rescan every new row dict
+                    with gc_paused():
+                        return pickle.loads(payload)
+                finally:
+                    payload.release()
+    except (OSError, ValueError, struct.error, pickle.UnpicklingError, EOFError):
+        return None
+
+def _write_snapshot(csv_path, header, payload):
+    tmp = csv_path + SNAPSHOT_SUFFIX + ".tmp"
+    with _snapshot_lock:
+        try:
+            with open(tmp, "wb") as f:
+                f.write(header)
+                f.write(payload)
+            os.replace(tmp, csv_path + SNAPSHOT_SUFFIX)
+        except OSError:
+            pass
+
+def refresh_snapshot(csv_path, data):
+    """Regenerate the snapshot for csv_path in the background.
+
+    The data is pickled and the CSV stat'ed right away so the snapshot always
+    matches the file as it is now; only the disk write happens on the thread.
+    """
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return
+    payload = pickle.dumps(data, protocol=5)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, st.st_size, st.st_mtime_ns,
+                                  zlib.crc32(payload), len(payload))
+    threading.Thread(target=_write_snapshot, args=(csv_path, header, payload), daemon=True).start()
+
 # ----------------- File IO -----------------
 def save_staff():
     with open(STAFF_FILE, "w", newline="", encoding="utf-8") as f:
@@ -67,8 +251,13 @@ def save_staff():
         writer.writerow(["Name", "Specialization", "Salary"])
         for i in range(len(staffNames)):
             writer.writerow([staffNames[i], staffSpecs[i], staffSalaries[i]])
+    refresh_snapshot(STAFF_FILE, (staffNames, staffSpecs, staffSalaries))
 
 def load_staff():
+    cached = read_snapshot(STAFF_FILE)
+    if cached is not None:
+        staffNames[:], staffSpecs[:], staffSalaries[:] = cached
+        return
     staffNames.clear(); staffSpecs.clear(); staffSalaries.clear()
     try:
         with open(STAFF_FILE, newline="", encoding="utf-8") as f:
@@ -80,6 +269,7 @@ def load_staff():
                     staffSalaries.append(int(row.get("Salary",0)))
                 except ValueError:
                     staffSalaries.append(0)
+        refresh_snapshot(STAFF_FILE, (staffNames, staffSpecs, staffSalaries))
     except FileNotFoundError:
         # default sample staff if file missing
         staffNames.extend(["Asha", "Rohit"])
@@ -93,9 +283,15 @@ def save_appointments():
         writer.writerow(["ID","Name","Services","Date","Time","Staff"])
         for a in Appointments:
             writer.writerow([a["id"], a["name"], ";".join(a["services"]), a["date"], a["time"], a["staff"]])
+    refresh_snapshot(APPT_FILE, Appointments)
 
 def load_appointments():
     global Next_id
+    cached = read_snapshot(APPT_FILE)
+    if cached is not None:
+        Appointments[:] = cached
+        Next_id = max([a["id"] for a in Appointments] + [archived_max_appointment_id()]) + 1
+        return
     Appointments.clear()
     try:
         with open(APPT_FILE, newline="", encoding="utf-8") as f:
@@ -110,31 +306,624 @@ def load_appointments():
                     "time": row.get("Time",""),
                     "staff": row.get("Staff","")
                 })
-        if Appointments:
-            Next_id = max(a["id"] for a in Appointments) + 1
+        Next_id = max([a["id"] for a in Appointments] + [archived_max_appointment_id()]) + 1
+        refresh_snapshot(APPT_FILE, Appointments)
     except FileNotFoundError:
-        Next_id = 1
+        Next_id = archived_max_appointment_id() + 1
 
 def save_bill_record(appointment, total, discount_amt, final_amt):
+    save_bill_records([(appointment, total, discount_amt, final_amt)])
+
+def save_bill_records(bills):
+    """Append (appointment, total, discount_amt, final_amt) bills to BILL_FILE in one write."""
     today = datetime.date.today().strftime("%Y-%m-%d")
+    append_bill_rows([[appointment["id"], appointment["name"], appointment["staff"], ";".join(appointment["services"]), total, discount_amt, final_amt, today]
+                      for appointment, total, discount_amt, final_amt in bills])
+
+def append_bill_rows(rows):
+    """Append rows (values in BILL_HEADERS order) to BILL_FILE and announce each one."""
     file_exists = os.path.exists(BILL_FILE)
-    headers = ["ID","Name","Staff","Services","Total","Discount","Final","Date"]
+    headers = BILL_HEADERS
     with open(BILL_FILE, "a", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         if not file_exists or os.stat(BILL_FILE).st_size == 0:
             writer.writerow(headers)
-        writer.writerow([appointment["id"], appointment["name"], appointment["staff"], ";".join(appointment["services"]), total, discount_amt, final_amt, today])
+        writer.writerows(rows)
+    saved = [dict(zip(headers, [str(v) for v in values])) for values in rows]
+    for row in saved:
+        publish("bill_saved", row)
+    publish("bills_saved", saved)
+
+# ----------------- CSV Scanner -----------------
+# Ledger readers use scan_csv() instead of csv.DictReader: the file is
+# memory-mapped and processed in chunks. Plain chunks are split once and
+# converted column by column, so unused fields are never decoded and no
+# per-row dicts are built. Chunks containing quotes go through the csv
+# module so quoted commas, quotes and newlines are still handled correctly.
+SCAN_CHUNK = 1 << 20
+_BYTES_CONVERTERS = (float, int)   # accept raw bytes, no decode needed
+
+def _convert_column(values, decode):
+    """Decode a list of raw values; ones that fail become None, so the column keeps its length."""
+    try:
+        return list(map(decode, values))
+    except ValueError:
+        out = []
+        for v in values:
+            try:
+                out.append(decode(v))
+            except ValueError:
+                out.append(None)
+        return out
+
+def _scan_buffer(buf, columns, types):
+    n = len(buf)
+    end = buf.find(b"\n")
+    if end < 0:
+        end = n
+    header = next(csv.reader([bytes(buf[:end]).decode("utf-8-sig").rstrip("\r")]), [])
+    idx = [header.index(c) if c in header else None for c in columns]
+    convs = [(types or {}).get(c) for c in columns]
+    last = max([i for i in idx if i is not None], default=0)
+    decoders = []
+    for conv in convs:
+        if conv is None:
+            decoders.append(bytes.decode)
+        elif conv in _BYTES_CONVERTERS:
+            decoders.append(conv)
+        else:
+            decoders.append(lambda raw, conv=conv: conv(raw.decode("utf-8")))
+
+    def project(fields, empty, decode_all):
+        out = []
+        for i, conv, decode in zip(idx, convs, decode_all):
+            raw = fields[i] if i is not None and i < len(fields) else empty
+            try:
+                raw = decode(raw)
+            except ValueError:
+                raw = None
+            out.append(raw)
+        return tuple(out)
+    text_decoders = [conv or str for conv in convs]
+
+    pos = end + 1
+    while pos < n:
+        stop = min(pos + SCAN_CHUNK, n)
+        if stop < n:
+            nl = buf.rfind(b"\n", pos, stop)
+            if nl < 0:
+                nl = buf.find(b"\n", stop)
+            stop = n if nl < 0 else nl + 1
+        chunk = buf[pos:stop]
+        # a quoted field may contain newlines: grow the chunk until quotes balance
+        while chunk.count(b'"') % 2 and stop < n:
+            nl = buf.find(b"\n", stop)
+            stop = n if nl < 0 else nl + 1
+            chunk = buf[pos:stop]
+        pos = stop
+        if b'"' in chunk:
+            for fields in csv.reader(StringIO(chunk.decode("utf-8"), newline="")):
+                if fields:
+                    yield project(fields, "", text_decoders)
+            continue
+        if b"\r" in chunk:
+            chunk = chunk.replace(b"\r", b"")
+        with gc_paused():
+            rows = [line.split(b",", last + 1) for line in chunk.split(b"\n") if line]
+            if rows and min(map(len, rows)) > last:
+                out = []
+                for i, decode in zip(idx, decoders):
+                    if i is None:
+                        out.append(_convert_column([b""] * len(rows), decode))
+                    else:
+                        out.append(_convert_column(list(map(itemgetter(i), rows)), decode))
+                columns_ready = True
+            else:
+                columns_ready = False
+        if columns_ready:
+            yield from zip(*out)
+        else:
+            # short rows in this chunk: fall back to row-at-a-time projection
+            for fields in rows:
+                yield project(fields, b"", decoders)
+
+def scan_csv(path, columns, types=None):
+    """Yield a tuple of the requested columns for every row of a CSV file.
+
+    types maps a column name to a converter such as float; values it cannot
+    convert come back as None. Missing columns read as "". Files ending in
+    .gz are decompressed in memory, everything else is memory-mapped.
+    """
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            yield from _scan_buffer(f.read(), columns, types)
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from _scan_buffer(mm, columns, types)
+
+# ----------------- Archive -----------------
+# Rows from closed months live in ARCHIVE_DIR as gzip CSV segments
+# (bills_YYYY-MM.csv.gz, appointments_YYYY-MM.csv.gz), each with a JSON
+# summary next to it. Readers use the summaries where they can and only open
+# the segments for the months they need; the hot CSVs hold recent rows only.
+_summary_cache = {}
+
+def _segment_path(kind, month, ext):
+    return os.path.join(ARCHIVE_DIR, f"{kind}_{month}.{ext}")
+
+def archived_months(kind, archive_dir=ARCHIVE_DIR):
+    if not os.path.isdir(archive_dir):
+        return []
+    prefix = kind + "_"
+    return sorted(n[len(prefix):-len(".json")] for n in os.listdir(archive_dir)
+                  if n.startswith(prefix) and n.endswith(".json"))
+
+def segment_summary(kind, month):
+    path = _segment_path(kind, month, "json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _summary_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        summary = json.load(f)
+    _summary_cache[path] = (mtime, summary)
+    return summary
+
+_SEGMENT_HEADERS = {"bills": BILL_HEADERS, "appointments": APPT_HEADERS}
+
+def iter_segment_rows(kind, month):
+    headers = _SEGMENT_HEADERS[kind]
+    for values in scan_csv(_segment_path(kind, month, "csv.gz"), headers):
+        yield dict(zip(headers, values))
+
+def scan_ledger(columns, first="", last="9999-12-31", types=None):
+    """Yield tuples of the given bill columns for bills dated first..last (inclusive).
+
+    Archived months outside the range are skipped without being opened.
+    """
+    projection = list(columns) + ["Date"]
+    paths = [_segment_path("bills", m, "csv.gz") for m in archived_months("bills") if first[:7] <= m <= last[:7]]
+    if os.path.exists(BILL_FILE):
+        paths.append(BILL_FILE)
+    for path in paths:
+        for values in scan_csv(path, projection, types):
+            if first <= values[-1] <= last:
+                yield values[:-1]
+
+def iter_bill_rows(first="", last="9999-12-31"):
+    """Yield bill rows (as dicts) dated first..last (inclusive) from the archive and the hot file."""
+    for values in scan_ledger(BILL_HEADERS, first, last):
+        yield dict(zip(BILL_HEADERS, values))
+
+def iter_archived_appointments():
+    """Yield archived appointments in the same dict form as Appointments."""
+    for month in archived_months("appointments"):
+        for row in iter_segment_rows("appointments", month):
+            yield {"id": int(row.get("ID", 0)), "name": row.get("Name", ""),
+                   "services": row.get("Services", "").split(";") if row.get("Services") else [],
+                   "date": row.get("Date", ""), "time": row.get("Time", ""), "staff": row.get("Staff", "")}
+
+def archived_max_appointment_id():
+    ids = [segment_summary("appointments", m)["max_id"] for m in archived_months("appointments")]
+    return max(ids, default=0)
+
+def archived_billed_ids(appointment_ids):
+    """The ids among appointment_ids (strings) that have a bill in the archive.
+
+    Only segments whose summary id range (or other_ids) covers a wanted id are opened.
+    """
+    wanted, found = set(appointment_ids), set()
+    numeric = []
+    for key in wanted:
+        try:
+            numeric.append(int(key))
+        except ValueError:
+            pass
+    for month in archived_months("bills"):
+        if found >= wanted:
+            break
+        summary = segment_summary("bills", month)
+        in_range = summary["min_id"] is not None and any(summary["min_id"] <= n <= summary["max_id"] for n in numeric)
+        if in_range or wanted.intersection(summary["other_ids"]):
+            found.update(bill_id for bill_id, in scan_csv(_segment_path("bills", month, "csv.gz"), ["ID"]) if bill_id in wanted)
+    return found
+
+def _bill_segment_summary(rows):
+    service_counts, staff_counts, staff_revenue = Counter(), Counter(), Counter()
+    revenue = 0.0
+    customers = 0
+    int_ids, other_ids = [], []
+    for row in rows:
+        for s in row.get("Services", "").split(";"):
+            service_counts[s.strip()] += 1
+        try:
+            int_ids.append(int(row.get("ID", "")))
+        except ValueError:
+            other_ids.append(row.get("ID", ""))
+        try:
+            final = float(row.get("Final", 0))
+        except ValueError:
+            continue
+        revenue += final
+        customers += 1
+        staff_counts[row.get("Staff", "")] += 1
+        staff_revenue[row.get("Staff", "")] += final
+    return {"rows": len(rows), "revenue": revenue, "customers": customers,
+            "top_service": service_counts.most_common(1)[0][0] if service_counts else "-",
+            "top_staff": staff_counts.most_common(1)[0][0] if staff_counts else "-",
+            "service_counts": service_counts, "staff_counts": staff_counts, "staff_revenue": staff_revenue,
+            "min_id": min(int_ids, default=None), "max_id": max(int_ids, default=None), "other_ids": other_ids}
+
+def _appointment_segment_summary(rows):
+    staff_minutes, staff_counts = Counter(), Counter()
+    ids = []
+    for row in rows:
+        services = row.get("Services", "").split(";") if row.get("Services") else []
+        staff_minutes[row.get("Staff", "")] += total_time(services)
+        staff_counts[row.get("Staff", "")] += 1
+        try:
+            ids.append(int(row.get("ID", 0)))
+        except ValueError:
+            pass
+    return {"rows": len(rows), "max_id": max(ids, default=0),
+            "staff_minutes": staff_minutes, "staff_counts": staff_counts}
+
+def _archive_file(kind, path, headers, cutoff, summarize):
+    if not os.path.exists(path):
+        return 0
+    rows = [dict(zip(headers, values)) for values in scan_csv(path, headers)]
+    old, keep = {}, []
+    for row in rows:
+        month = row.get("Date", "")[:7]
+        if month and month < cutoff:
+            old.setdefault(month, []).append(row)
+        else:
+            keep.append(row)
+    if not old:
+        return 0
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    for month, new_rows in old.items():
+        # merge into an existing segment; rows already there (from an
+        # interrupted earlier run) are not added twice
+        seg = _segment_path(kind, month, "csv.gz")
+        existing = list(iter_segment_rows(kind, month)) if os.path.exists(seg) else []
+        seen = {tuple(r.get(h, "") for h in headers) for r in existing}
+        merged = existing + [r for r in new_rows if tuple(r.get(h, "") for h in headers) not in seen]
+        with gzip.open(seg + ".tmp", "wt", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=headers, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(merged)
+        os.replace(seg + ".tmp", seg)
+        summary = summarize(merged)
+        summary["month"] = month
+        summary_path = _segment_path(kind, month, "json")
+        with open(summary_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        os.replace(summary_path + ".tmp", summary_path)
+    # the hot file is rewritten last, after every segment is safely on disk
+    with open(path + ".tmp", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=headers, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(keep)
+    os.replace(path + ".tmp", path)
+    return sum(len(v) for v in old.values())
+
+def archive_closed_months(keep_months=ARCHIVE_KEEP_MONTHS):
+    """Move rows older than the last keep_months months from the hot CSVs into the archive."""
+    today = datetime.date.today()
+    year, month = today.year, today.month - (keep_months - 1)
+    while month < 1:
+        year -= 1; month += 12
+    cutoff = f"{year}-{month:02d}"
+    moved_bills = _archive_file("bills", BILL_FILE, BILL_HEADERS, cutoff, _bill_segment_summary)
+    moved_appts = _archive_file("appointments", APPT_FILE, APPT_HEADERS, cutoff, _appointment_segment_summary)
+    if moved_appts:
+        load_appointments()
+        publish("appointments_reloaded")
+    if moved_bills or moved_appts:
+        publish("ledger_archived")
+    return moved_bills + moved_appts
+
+# ----------------- Bill Index -----------------
+# Every bill ever saved (archive segments in month order, then bills.csv) has
+# a row number; each staff member, service, month and amount bucket keeps a
+# bitmap of its rows. Bitmaps are Python ints, so combining filters is a
+# single C-level AND. BILL_INDEX_FILE stores them zlib-compressed, and syncing
+# only reads what was appended to bills.csv since the last sync.
+INDEX_FIELDS = ("staff", "service", "month", "bucket")
+_INDEX_COLUMNS = ("Staff", "Services", "Date", "Final")
+_bill_index_lock = threading.Lock()
+_bill_index_saves = [0, 0]   # generations started / written
+
+def _amount_bucket(amount):
+    return max(bisect.bisect_right(AMOUNT_BUCKETS, amount) - 1, 0)
+
+def _bitmap(positions, nbits):
+    buf = bytearray((nbits + 7) // 8)
+    for r in positions:
+        buf[r >> 3] |= 1 << (r & 7)
+    return int.from_bytes(buf, "little")
+
+def _bits_desc(bitmap):
+    """Yield the positions of the set bits, highest first."""
+    digits = format(bitmap, "b")
+    top = len(digits) - 1
+    i = digits.find("1")
+    while i >= 0:
+        yield top - i
+        i = digits.find("1", i + 1)
+
+_FLAG_TABLE = bytes.maketrans(b"01", b"\x00\x01")
+# one complete CSV record: newlines inside quotes do not end it
+_CSV_RECORD = re.compile(rb'(?:[^"\n]*"[^"]*")*[^"\n]*\n')
+
+def _read_csv_records(path, start):
+    """Return (offsets, rows, end) for the complete CSV records from byte offset start on."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read()
+    offsets, end, match = [], 0, _CSV_RECORD.match
+    m = match(data)
+    while m:   # records must be back to back; a torn last record is left for the next sync
+        offsets.append(start + end)
+        end = m.end()
+        m = match(data, end)
+    text = data[:end].decode("utf-8-sig" if start == 0 else "utf-8")
+    return offsets, list(csv.reader(StringIO(text, newline=""))), start + end
+
+def _archived_bill_segments():
+    out = []
+    for month in archived_months("bills"):
+        st = os.stat(_segment_path("bills", month, "csv.gz"))
+        out.append((month, st.st_size, st.st_mtime_ns))
+    return out
+
+class BillIndex:
+    """Bitmap indexes over the bill ledger. Use bill_index() for the shared, synced instance."""
+
+    def __init__(self):
+        self.rows = 0
+        self.segments = []      # (month, first row, row count)
+        self.archived = []      # (month, size, mtime_ns) of the segments when indexed
+        self.hot_base = 0       # row number of the first bills.csv row
+        self.hot_header = list(BILL_HEADERS)
+        self.hot_offsets = array("Q")
+        self.hot_size = 0       # bytes of bills.csv indexed so far
+        self.hot_tail = 0       # crc32 of the last bytes indexed, to detect rewrites
+        self.amounts = array("d")
+        self.bitmaps = {field: {} for field in INDEX_FIELDS}
+
+    def _add_rows(self, rows):
+        """Index (staff, services, date, final) tuples as the next rows."""
+        pending = {field: {} for field in INDEX_FIELDS}
+        n = self.rows
+        for staff, services, date, final in rows:
+            pending["staff"].setdefault(staff, []).append(n)
+            for s in services.split(";"):
+                if s.strip():
+                    pending["service"].setdefault(s.strip(), []).append(n)
+            if date:
+                pending["month"].setdefault(date[:7], []).append(n)
+            if final is None:
+                self.amounts.append(0.0)   # unparseable amounts never match an amount filter
+            else:
+                self.amounts.append(final)
+                pending["bucket"].setdefault(_amount_bucket(final), []).append(n)
+            n += 1
+        self.rows = n
+        for field, keys in pending.items():
+            maps = self.bitmaps[field]
+            for key, positions in keys.items():
+                maps[key] = maps.get(key, 0) | _bitmap(positions, n)
+
+    def _tail_crc(self):
+        with open(BILL_FILE, "rb") as f:
+            f.seek(max(self.hot_size - 64, 0))
+            return zlib.crc32(f.read(min(self.hot_size, 64)))
+
+    def _catch_up(self):
+        if not os.path.exists(BILL_FILE):
+            return
+        offsets, records, end = _read_csv_records(BILL_FILE, self.hot_size)
+        if self.hot_size == 0 and records:
+            self.hot_header = records[0]
+            offsets, records = offsets[1:], records[1:]
+        idx = [self.hot_header.index(c) if c in self.hot_header else None for c in _INDEX_COLUMNS]
+        kept = [(o, r) for o, r in zip(offsets, records) if r]
+        def project(fields):
+            staff, services, date, final = (fields[i] if i is not None and i < len(fields) else "" for i in idx)
+            try:
+                final = float(final)
+            except ValueError:
+                final = None
+            return staff, services, date, final
+        self._add_rows(project(r) for _, r in kept)
+        self.hot_offsets.extend(o for o, _ in kept)
+        self.hot_size = end
+        self.hot_tail = self._tail_crc()
+
+    def build(self):
+        self.__init__()
+        with gc_paused():
+            self._build()
+
+    def _build(self):
+        for month, size, mtime_ns in _archived_bill_segments():
+            first = self.rows
+            self._add_rows(scan_csv(_segment_path("bills", month, "csv.gz"), _INDEX_COLUMNS, {"Final": float}))
+            self.segments.append((month, first, self.rows - first))
+            self.archived.append((month, size, mtime_ns))
+        self.hot_base = self.rows
+        self._catch_up()
+
+    def _hot_unchanged(self):
+        try:
+            if os.stat(BILL_FILE).st_size < self.hot_size:
+                return False
+        except OSError:
+            return self.hot_size == 0
+        return self._tail_crc() == self.hot_tail
+
+    def sync(self):
+        """Bring the index up to date with the ledger; returns True if anything changed."""
+        try:
+            archived = _archived_bill_segments()
+        except OSError:
+            archived = None
+        if archived != self.archived or not self._hot_unchanged():
+            self.build()
+            return True
+        size = self.hot_size
+        with gc_paused():
+            self._catch_up()
+        return self.hot_size != size
+
+    def match(self, staff=None, service=None, month=None, min_final=None, max_final=None):
+        """Bitmap of the rows matching every given filter; None means any."""
+        result = (1 << self.rows) - 1
+        for field, key in (("staff", staff), ("service", service), ("month", month)):
+            if key is not None:
+                result &= self.bitmaps[field].get(key, 0)
+        if min_final is None and max_final is None:
+            return result
+        lo = float("-inf") if min_final is None else min_final
+        hi = float("inf") if max_final is None else max_final
+        whole = edge = 0
+        for b, bitmap in self.bitmaps["bucket"].items():
+            b_lo = AMOUNT_BUCKETS[b] if b else float("-inf")
+            b_hi = AMOUNT_BUCKETS[b + 1] if b + 1 < len(AMOUNT_BUCKETS) else float("inf")
+            if b_hi <= lo or b_lo > hi:
+                continue
+            if lo <= b_lo and b_hi <= hi:
+                whole |= bitmap
+            else:
+                edge |= bitmap
+        # buckets straddling a limit are checked row by row
+        amounts = self.amounts
+        keep = [r for r in _bits_desc(result & edge) if lo <= amounts[r] <= hi]
+        return (result & whole) | _bitmap(keep, self.rows)
+
+    def total(self, bitmap):
+        flags = format(bitmap, "b")[::-1].encode().translate(_FLAG_TABLE)
+        return sum(compress(self.amounts, flags))
+
+    def fetch(self, bitmap, limit=200):
+        """Value lists (BILL_HEADERS order) of the newest matching bills, newest first."""
+        wanted = list(islice(_bits_desc(bitmap), limit))
+        found = {}
+        hot = [r for r in wanted if r >= self.hot_base]
+        if hot:
+            idx = [self.hot_header.index(c) if c in self.hot_header else None for c in BILL_HEADERS]
+            offsets = self.hot_offsets
+            with open(BILL_FILE, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for r in hot:
+                        j = r - self.hot_base
+                        end = offsets[j + 1] if j + 1 < len(offsets) else self.hot_size
+                        fields = next(csv.reader(StringIO(mm[offsets[j]:end].decode("utf-8"), newline="")), [])
+                        found[r] = [fields[i] if i is not None and i < len(fields) else "" for i in idx]
+        for month, first, count in self.segments:
+            need = {r - first for r in wanted if first <= r < first + count}
+            for i, values in enumerate(scan_csv(_segment_path("bills", month, "csv.gz"), BILL_HEADERS)):
+                if i in need:
+                    found[first + i] = list(values)
+                    need.discard(i)
+                    if not need:
+                        break
+        return [found[r] for r in wanted if r in found]
+
+    def save(self):
+        """Write BILL_INDEX_FILE in the background (compression included)."""
+        state = dict(self.__dict__)
+        state["amounts"] = self.amounts.tobytes()
+        state["hot_offsets"] = self.hot_offsets.tobytes()
+        state["bitmaps"] = {field: dict(maps) for field, maps in self.bitmaps.items()}
+        _bill_index_saves[0] += 1
+        threading.Thread(target=_write_bill_index, args=(state, _bill_index_saves[0]), daemon=True).start()
+
+    @classmethod
+    def load(cls):
+        """The index stored in BILL_INDEX_FILE, or None if it is missing or unreadable."""
+        try:
+            with open(BILL_INDEX_FILE, "rb") as f:
+                state = pickle.load(f)
+            if state.pop("version", None) != BILL_INDEX_VERSION:
+                return None
+            index = cls()
+            index.amounts.frombytes(zlib.decompress(state.pop("amounts")))
+            index.hot_offsets.frombytes(zlib.decompress(state.pop("hot_offsets")))
+            index.bitmaps = {field: {key: int.from_bytes(zlib.decompress(packed), "little")
+                                     for key, packed in maps.items()}
+                             for field, maps in state.pop("bitmaps").items()}
+            index.__dict__.update(state)
+            return index
+        except (OSError, ValueError, KeyError, AttributeError, zlib.error, pickle.UnpicklingError, EOFError):
+            return None
+
+def _write_bill_index(state, generation):
+    packed = dict(state, version=BILL_INDEX_VERSION,
+                  amounts=zlib.compress(state["amounts"]),
+                  hot_offsets=zlib.compress(state["hot_offsets"]),
+                  bitmaps={field: {key: zlib.compress(bm.to_bytes((bm.bit_length() + 7) // 8, "little"))
+                                   for key, bm in maps.items()}
+                           for field, maps in state["bitmaps"].items()})
+    payload = pickle.dumps(packed, protocol=5)
+    with _bill_index_lock:
+        if generation < _bill_index_saves[1]:
+            return   # a newer save already landed
+        try:
+            with open(BILL_INDEX_FILE + ".tmp", "wb") as f:
+                f.write(payload)
+            os.replace(BILL_INDEX_FILE + ".tmp", BILL_INDEX_FILE)
+            _bill_index_saves[1] = generation
+        except OSError:
+            pass
+
+_bill_index = None
+
+def bill_index():
+    """The shared BillIndex, loaded (or built) on first use and synced with the ledger."""
+    global _bill_index
+    if _bill_index is None:
+        _bill_index = BillIndex.load() or BillIndex()
+    if _bill_index.sync():
+        _bill_index.save()
+    return _bill_index
+
+def query_bills(staff=None, service=None, month=None, min_final=None, max_final=None, limit=200):
+    """Return (count, total of Final, newest matching bill rows) across the whole ledger."""
+    index = bill_index()
+    bitmap = index.match(staff, service, month, min_final, max_final)
+    return bitmap.bit_count(), index.total(bitmap), index.fetch(bitmap, limit)
+
+def _sync_bill_index(*_):
+    # keep an index that is already in memory current; otherwise wait for first use
+    if _bill_index is not None and _bill_index.sync():
+        _bill_index.save()
+
+subscribe("bill_saved", _sync_bill_index)
+subscribe("ledger_archived", _sync_bill_index)
 
 # ----------------- Utilities -----------------
 def total_time(services):
     return sum(service_duration.get(s, 30) for s in services)
 
 def next_time_slot_for_services(services):
-    if not Appointments:
+    # recurring occurrences count up to the day of the latest stored appointment
+    today = datetime.date.today().isoformat()
+    horizon = max([today] + [a["date"] for a in Appointments])
+    booked = Appointments + list(iter_occurrences(today, horizon))
+    if not booked:
         return datetime.datetime.now()
     def appt_dt(a):
         return datetime.datetime.strptime(a["date"] + " " + a["time"], "%Y-%m-%d %H:%M")
-    last = max(Appointments, key=appt_dt)
+    last = max(booked, key=appt_dt)
     last_start = appt_dt(last)
     slot = last_start + datetime.timedelta(minutes=total_time(last["services"]))
     return max(slot, datetime.datetime.now())
@@ -147,12 +936,1193 @@ def find_qualified_staff(selected_services):
             qualified.append(staffNames[i])
     return qualified
 
+def staff_skills():
+    """Map each staff name to the lower-cased set of services they can perform."""
+    return {staffNames[i]: {s.strip().lower() for s in staffSpecs[i].split(',')} for i in range(len(staffNames))}
+
+def time_to_minutes(hhmm):
+    return int(hhmm[:2]) * 60 + int(hhmm[3:5])
+
+# ----------------- Bulk Import -----------------
+def read_import_file(path):
+    """Read appointment rows from a CSV (appointments.csv layout) or JSON list of objects."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("appointments", [])
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            data = list(csv.DictReader(f))
+    # accept "Name" as well as "name" etc.
+    return [{str(k).strip().lower(): v for k, v in row.items()} for row in data]
+
+def validate_appointment_rows(rows):
+    """Check imported rows against the catalog, staff skills and existing bookings.
+
+    Returns (appointments, errors): appointments are ready to commit (without ids)
+    and errors is a list of (row number, message), counting the header as row 1.
+    """
+    catalog = {s.lower(): s for s in services_catalog}
+    skills = staff_skills()
+    # booked intervals per (staff, date), kept sorted for bisect overlap checks
+    busy = {}
+    def add_busy(staff, date, start, end):
+        bisect.insort(busy.setdefault((staff, date), []), (start, end))
+    def is_free(staff, date, start, end):
+        slots = busy.get((staff, date))
+        if not slots:
+            return True
+        i = bisect.bisect_left(slots, (start, end))
+        if i > 0 and slots[i - 1][1] > start:
+            return False
+        return i == len(slots) or slots[i][0] >= end
+    for a in Appointments:
+        if a["staff"] in skills:
+            try:
+                start = time_to_minutes(a["time"])
+            except ValueError:
+                continue
+            add_busy(a["staff"], a["date"], start, start + total_time(a["services"]))
+
+    appts, errors = [], []
+    for line, row in enumerate(rows, start=2):
+        name = str(row.get("name") or "").strip()
+        if not name or not name.replace(" ", "").isalpha():
+            errors.append((line, "invalid name"))
+            continue
+        raw = row.get("services") or []
+        if isinstance(raw, str):
+            raw = raw.split(";")
+        raw = [str(x).strip() for x in raw if str(x).strip()]
+        unknown = [x for x in raw if x.lower() not in catalog]
+        if not raw or unknown:
+            errors.append((line, f"unknown services: {', '.join(unknown)}" if unknown else "no services"))
+            continue
+        services = [catalog[x.lower()] for x in raw]
+        try:
+            date = datetime.date.fromisoformat(str(row.get("date") or "").strip()).strftime("%Y-%m-%d")
+            hh, mm = str(row.get("time") or "").strip().split(":")
+            time = datetime.time(int(hh), int(mm)).strftime("%H:%M")
+        except ValueError:
+            errors.append((line, "invalid date or time"))
+            continue
+        start = time_to_minutes(time)
+        end = start + total_time(services)
+        wanted = {x.lower() for x in services}
+        staff = str(row.get("staff") or "").strip()
+        if staff in ("", "-- Auto --", "Auto"):
+            free = [n for n in skills if wanted <= skills[n] and is_free(n, date, start, end)]
+            staff = free[0] if free else "Not Assigned"
+        elif staff != "Not Assigned":
+            if staff not in skills:
+                errors.append((line, f"unknown staff: {staff}"))
+                continue
+            if not wanted <= skills[staff]:
+                errors.append((line, f"{staff} is not qualified for {', '.join(services)}"))
+                continue
+            if not is_free(staff, date, start, end):
+                errors.append((line, f"{staff} is already booked at {date} {time}"))
+                continue
+        if staff in skills:
+            add_busy(staff, date, start, end)
+        appts.append({"name": name, "services": services, "date": date, "time": time, "staff": staff})
+    return appts, errors
+
+def commit_appointments(appts):
+    """Assign ids to validated appointments and save them with a single write."""
+    for a in appts:
+        a["id"] = take_appointment_id()
+    Appointments.extend(appts)
+    Appointments.sort(key=lambda a: (a["date"], a["time"]))
+    save_appointments()
+    publish("appointments_reloaded")
+
+# ----------------- Day Planner -----------------
+def _earliest_gap(slots, duration, lo, hi, close):
+    """First start >= lo and <= hi where [start, start+duration) fits between sorted busy slots."""
+    start = lo
+    for s, e in slots:
+        if start + duration <= s:
+            break
+        start = max(start, e)
+    if start > hi or start + duration > close:
+        return None
+    return start
+
+def _pack(order, requests, base_busy, close_min):
+    busy = {n: list(v) for n, v in base_busy.items()}
+    placed, unplaced = [], []
+    for i in order:
+        req = requests[i]
+        best = None
+        for name in req["qualified"]:
+            start = _earliest_gap(busy[name], req["duration"], req["earliest"], req["latest"], close_min)
+            if start is None:
+                continue
+            load = sum(e - s for s, e in busy[name])
+            if best is None or (start, load) < best[:2]:
+                best = (start, load, name)
+        if best is None:
+            unplaced.append(i)
+            continue
+        start, _, name = best
+        bisect.insort(busy[name], (start, start + req["duration"]))
+        placed.append((i, name, start))
+    minutes = sum(requests[i]["duration"] for i, _, _ in placed)
+    wait = sum(start - requests[i]["earliest"] for i, _, start in placed)
+    return (minutes, len(placed), -wait), placed, unplaced
+
+def plan_day(date, requests, open_time=DAY_OPEN, close_time=DAY_CLOSE, time_limit=PLANNER_TIME_LIMIT, seed=0):
+    """Pack a day's waiting list onto qualified staff around the existing bookings.
+
+    Each request has "name", "services" and an optional "earliest"/"latest" HH:MM
+    window for its start time. A greedy packing is improved by random reorderings
+    until time_limit runs out, preferring more booked minutes, then more customers,
+    then less total wait. Returns (plan, unplaced): plan holds appointment dicts
+    (without ids) with an extra "wait" in minutes, unplaced the leftover requests.
+    """
+    deadline = perf_counter() + time_limit
+    open_min, close_min = time_to_minutes(open_time), time_to_minutes(close_time)
+    skills = staff_skills()
+    busy = {n: [] for n in skills}
+    for a in appointments_between(date, date):
+        if a["staff"] in busy:
+            start = time_to_minutes(a["time"])
+            busy[a["staff"]].append((start, start + total_time(a["services"])))
+    for slots in busy.values():
+        slots.sort()
+
+    reqs = []
+    for r in requests:
+        wanted = {s.lower() for s in r["services"]}
+        duration = total_time(r["services"])
+        earliest = max(open_min, time_to_minutes(r.get("earliest") or open_time))
+        latest = min(close_min - duration, time_to_minutes(r.get("latest") or close_time))
+        reqs.append({"duration": duration, "earliest": earliest, "latest": latest,
+                     "qualified": [n for n in skills if wanted <= skills[n]]})
+
+    # tightest windows and longest services first, then local search on the order
+    order = sorted(range(len(reqs)), key=lambda i: (reqs[i]["latest"] - reqs[i]["earliest"], -reqs[i]["duration"]))
+    best = _pack(order, reqs, busy, close_min)
+    rng = random.Random(seed)
+    while len(order) > 1 and perf_counter() < deadline:
+        if not best[2] and best[0][2] == 0:
+            break   # everyone placed with no wait
+        trial = list(order)
+        # pull a request that did not fit towards the front, or swap two at random
+        if best[2] and rng.random() < 0.5:
+            j = order.index(rng.choice(best[2]))
+        else:
+            j = rng.randrange(len(trial))
+        k = rng.randrange(len(trial))
+        trial[j], trial[k] = trial[k], trial[j]
+        result = _pack(trial, reqs, busy, close_min)
+        if result[0] >= best[0]:
+            order, best = trial, result
+
+    plan = []
+    for i, name, start in sorted(best[1], key=lambda p: (p[2], p[1])):
+        r = requests[i]
+        plan.append({"name": r["name"], "services": list(r["services"]), "date": date,
+                     "time": f"{start // 60:02d}:{start % 60:02d}", "staff": name,
+                     "wait": start - reqs[i]["earliest"]})
+    return plan, [requests[i] for i in best[2]]
+
+# ----------------- Walk-in Queue -----------------
+# Each walk-in joins the queue of the qualified staff member who can start
+# them soonest. A staff queue is a heap on (priority level, arrival) plus one
+# Fenwick tree of service minutes per level, so joining, leaving, starting
+# and finishing are O(log n) and so is any ticket's estimated wait:
+#   time left on the current service + minutes queued at higher levels
+#   + minutes queued ahead at the ticket's own level.
+class _Fenwick:
+    """Prefix sums over a sequence that only grows at the end."""
+
+    def __init__(self):
+        self.tree = [0]
+        self.total = 0
+
+    def append(self, value):
+        i = len(self.tree)
+        # node i covers (i - lowbit(i), i]: the new value plus the earlier part of that range
+        self.tree.append(value + self.prefix(i - 1) - self.prefix(i - (i & -i)))
+        self.total += value
+        return i
+
+    def add(self, i, delta):
+        self.total += delta
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        s = 0
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+class _StaffQueue:
+    def __init__(self):
+        self.heap = []   # (level, seq, ticket id)
+        self.minutes = [_Fenwick() for _ in WALKIN_LEVELS]
+        self.current = None
+        self.ends = None
+
+    def remaining(self, now):
+        """Minutes left on the current service (0 when idle or running over)."""
+        if self.current is None:
+            return 0
+        return max((self.ends - now).total_seconds() / 60, 0)
+
+class WalkInQueue:
+    """Live walk-in queues, one per staff member. Use the shared walkins instance."""
+
+    def __init__(self):
+        self.tickets = {}
+        self.queues = {}
+        self.seq = 0
+
+    def _queue(self, staff):
+        return self.queues.setdefault(staff, _StaffQueue())
+
+    def _enqueue(self, ticket, staff):
+        q = self._queue(staff)
+        level = ticket["level"]
+        ticket["staff"] = staff
+        ticket["slot"] = q.minutes[level].append(ticket["minutes"])
+        self.seq += 1
+        heapq.heappush(q.heap, (level, self.seq, ticket["id"]))
+
+    def _dequeue(self, ticket):
+        self.queues[ticket["staff"]].minutes[ticket["level"]].add(ticket["slot"], -ticket["minutes"])
+        ticket["slot"] = None   # its heap entry is skipped when it reaches the top
+
+    def _head(self, staff):
+        heap = self.queues[staff].heap
+        while heap and self.tickets[heap[0][2]]["slot"] is None:
+            heapq.heappop(heap)
+        return self.tickets[heap[0][2]] if heap else None
+
+    def wait_if_joined(self, staff, level, now):
+        q = self.queues.get(staff)
+        if q is None:
+            return 0
+        return q.remaining(now) + sum(q.minutes[l].total for l in range(level + 1))
+
+    def join(self, name, services, level=len(WALKIN_LEVELS) - 1, now=None):
+        """Queue a walk-in with the qualified staff member who can start them soonest."""
+        now = now or datetime.datetime.now()
+        qualified = find_qualified_staff(services)
+        if not qualified:
+            raise ValueError(f"No staff member can do: {', '.join(services)}")
+        staff = min(qualified, key=lambda s: self.wait_if_joined(s, level, now))
+        ticket = {"id": len(self.tickets) + 1, "name": name, "services": list(services), "level": level,
+                  "minutes": total_time(services), "joined": now, "staff": None, "slot": None,
+                  "state": "waiting", "appointment": None}
+        self.tickets[ticket["id"]] = ticket
+        self._enqueue(ticket, staff)
+        publish("walkins_changed")
+        return ticket
+
+    def leave(self, ticket_id):
+        ticket = self.tickets[ticket_id]
+        if ticket["state"] == "waiting":
+            self._dequeue(ticket)
+            ticket["state"] = "left"
+            publish("walkins_changed")
+
+    def estimated_wait(self, ticket, now=None):
+        """Minutes until the ticket's service should start."""
+        if ticket["state"] != "waiting":
+            return 0
+        now = now or datetime.datetime.now()
+        q = self.queues[ticket["staff"]]
+        level = ticket["level"]
+        ahead = sum(q.minutes[l].total for l in range(level)) + q.minutes[level].prefix(ticket["slot"] - 1)
+        return q.remaining(now) + ahead
+
+    def _steal(self, staff):
+        """Front ticket of the longest other queue that staff is qualified for, or None."""
+        skills = staff_skills().get(staff, set())
+        best = None
+        for other, q in self.queues.items():
+            head = self._head(other) if other != staff else None
+            if head and all(s.lower() in skills for s in head["services"]):
+                queued = sum(f.total for f in q.minutes)
+                if best is None or queued > best[0]:
+                    best = (queued, head)
+        return best and best[1]
+
+    def start_next(self, staff, now=None):
+        """Start staff's next walk-in (taking one from a busier queue if theirs is empty) and book it."""
+        now = now or datetime.datetime.now()
+        q = self._queue(staff)
+        if q.current is not None:
+            raise ValueError(f"{staff} is still serving {q.current['name']}")
+        ticket = self._head(staff) or self._steal(staff)
+        if ticket is None:
+            return None
+        self._dequeue(ticket)
+        ticket["staff"] = staff
+        ticket["state"] = "serving"
+        q.current = ticket
+        q.ends = now + datetime.timedelta(minutes=ticket["minutes"])
+        ticket["appointment"] = book_appointment(ticket["name"], ticket["services"], now, staff)
+        publish("walkins_changed")
+        return ticket
+
+    def finish(self, staff, now=None):
+        q = self._queue(staff)
+        if q.current is not None:
+            q.current["state"] = "done"
+            q.current = None
+            q.ends = None
+            publish("walkins_changed")
+
+    def waiting(self, staff):
+        """Tickets queued for staff, in service order."""
+        q = self.queues.get(staff)
+        if q is None:
+            return []
+        return [self.tickets[tid] for _, _, tid in sorted(q.heap) if self.tickets[tid]["slot"] is not None]
+
+walkins = WalkInQueue()
+
+def book_appointment(name, services, start, staff):
+    """Add an appointment starting at the given datetime, keeping Appointments in time order."""
+    appt = {"id": take_appointment_id(), "name": name, "services": list(services), "date": start.strftime("%Y-%m-%d"),
+            "time": start.strftime("%H:%M"), "staff": staff}
+    keys = [(a["date"], a["time"]) for a in Appointments]
+    Appointments.insert(bisect.bisect_right(keys, (appt["date"], appt["time"])), appt)
+    save_appointments()
+    publish("appointment_added", appt)
+    return appt
+
+# ----------------- Recurring Appointments -----------------
+# A standing booking is one rule in RECURRING_FILE:
+#   {"id", "name", "services", "staff", "time", "start", "until", "freq",
+#    "interval", "exceptions": [skipped YYYY-MM-DD dates]}
+# Occurrences are never stored; generators expand them for the dates being
+# looked at. An occurrence's id is "R<series id>-<YYYYMMDD>". Rescheduling
+# one occurrence skips it in the series and books it as a normal appointment.
+_recurring_cache = [None, []]   # RECURRING_FILE mtime, series
+
+def load_recurring():
+    """The series rules, re-read only when RECURRING_FILE changes."""
+    try:
+        mtime = os.stat(RECURRING_FILE).st_mtime_ns
+    except OSError:
+        return []
+    if _recurring_cache[0] != mtime:
+        with open(RECURRING_FILE, encoding="utf-8") as f:
+            _recurring_cache[:] = [mtime, json.load(f).get("series", [])]
+    return _recurring_cache[1]
+
+def save_recurring(series):
+    tmp = RECURRING_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "series": series}, f, indent=1)
+    os.replace(tmp, RECURRING_FILE)
+    _recurring_cache[:] = [None, []]
+    publish("recurring_changed")
+
+def _add_months(start, months):
+    year, month = divmod(start.month - 1 + months, 12)
+    year += start.year
+    return datetime.date(year, month + 1, min(start.day, calendar.monthrange(year, month + 1)[1]))
+
+def series_dates(rule, first, last):
+    """Yield the rule's occurrence dates from first to last (datetime.date, inclusive), minus exceptions."""
+    start = datetime.date.fromisoformat(rule["start"])
+    if rule.get("until"):
+        last = min(last, datetime.date.fromisoformat(rule["until"]))
+    first = max(first, start)
+    skip = set(rule.get("exceptions", ()))
+    step = rule.get("interval", 1)
+    if rule["freq"] == "weekly":
+        days = 7 * step
+        d = start + datetime.timedelta(days=-(-(first - start).days // days) * days)
+        while d <= last:
+            if d.isoformat() not in skip:
+                yield d
+            d += datetime.timedelta(days=days)
+    else:   # monthly on the start's day of month, clamped in shorter months
+        n = (first.year - start.year) * 12 + first.month - start.month
+        n -= n % step
+        d = _add_months(start, n)
+        while d <= last:
+            if d >= first and d.isoformat() not in skip:
+                yield d
+            n += step
+            d = _add_months(start, n)
+
+def _occurrence(rule, d):
+    return {"id": f"R{rule['id']}-{d.strftime('%Y%m%d')}", "name": rule["name"], "services": list(rule["services"]),
+            "date": d.isoformat(), "time": rule["time"], "staff": rule["staff"], "series": rule["id"]}
+
+def iter_occurrences(first, last):
+    """Yield appointment dicts for every recurring occurrence dated first..last ("YYYY-MM-DD", inclusive)."""
+    first, last = datetime.date.fromisoformat(first), datetime.date.fromisoformat(last)
+    for rule in load_recurring():
+        for d in series_dates(rule, first, last):
+            yield _occurrence(rule, d)
+
+def appointments_between(first, last):
+    """Stored appointments and recurring occurrences dated first..last, in time order."""
+    stored = [a for a in Appointments if first <= a["date"] <= last]
+    return sorted(stored + list(iter_occurrences(first, last)), key=lambda a: (a["date"], a["time"]))
+
+def find_occurrence(occurrence_id):
+    """The occurrence with this "R<sid>-<YYYYMMDD>" id, or None if the series does not produce it."""
+    m = re.fullmatch(r"R(\d+)-(\d{8})", str(occurrence_id))
+    if not m:
+        return None
+    d = datetime.datetime.strptime(m.group(2), "%Y%m%d").date()
+    rule = next((r for r in load_recurring() if r["id"] == int(m.group(1))), None)
+    if rule is None or next(series_dates(rule, d, d), None) is None:
+        return None
+    return _occurrence(rule, d)
+
+def find_appointment(appointment_id):
+    """A stored appointment by id, or a recurring occurrence by its R-id."""
+    if str(appointment_id).startswith("R"):
+        return find_occurrence(appointment_id)
+    return next((a for a in Appointments if str(a["id"]) == str(appointment_id)), None)
+
+def add_series(name, services, start, staff, freq, interval=1, until=""):
+    """Create a series whose first occurrence is at start (datetime)."""
+    series = [dict(r) for r in load_recurring()]
+    rule = {"id": terminal_id(max((r["id"] for r in series), default=0) + 1), "name": name, "services": list(services),
+            "staff": staff, "time": start.strftime("%H:%M"), "start": start.strftime("%Y-%m-%d"),
+            "until": until, "freq": freq, "interval": interval, "exceptions": []}
+    series.append(rule)
+    save_recurring(series)
+    return rule
+
+def _update_series(series_id, change):
+    series = [dict(r) for r in load_recurring()]
+    for rule in series:
+        if rule["id"] == series_id:
+            change(rule)
+    save_recurring(series)
+
+def skip_occurrence(occ):
+    _update_series(occ["series"], lambda r: r.__setitem__("exceptions", r.get("exceptions", []) + [occ["date"]]))
+
+def end_series_before(occ):
+    """Stop the series so that occ and everything after it no longer happen."""
+    last = datetime.date.fromisoformat(occ["date"]) - datetime.timedelta(days=1)
+    _update_series(occ["series"], lambda r: r.__setitem__("until", last.isoformat()))
+
+def detach_occurrence(occ, new_start):
+    """Move one occurrence: skip it in the series and book it as a normal appointment."""
+    skip_occurrence(occ)
+    return book_appointment(occ["name"], occ["services"], new_start, occ["staff"])
+
+# ----------------- Reminders -----------------
+# Upcoming reminders live in a heap of (fire time, seq, key) where key is
+# (appointment id, lead minutes). Only reminders firing before the horizon
+# (REMINDER_WINDOW_DAYS ahead) are kept; the horizon moves forward a day at a
+# time, so the appointment list is only scanned for the day being added.
+# Book / reschedule / cancel events push or invalidate entries in O(log n):
+# a heap entry is live only while pending[key] still carries its seq.
+class SpoolOutbox:
+    """Writes each reminder as a JSON file into a folder for a sender (SMS gateway, mailer) to pick up."""
+
+    def __init__(self, directory=OUTBOX_DIR):
+        self.directory = directory
+
+    def send(self, message):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, message["key"] + ".json")
+        if os.path.exists(path):
+            return False   # already spooled before a restart
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(message, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+class SmtpOutbox:
+    """Mails each reminder through an SMTP server, e.g. a local debugging server while testing."""
+
+    def __init__(self, host="localhost", port=1025, sender="reminders@belladesk.local", recipient="outbox@belladesk.local"):
+        self.host, self.port, self.sender, self.recipient = host, port, sender, recipient
+
+    def send(self, message):
+        msg = EmailMessage()
+        msg["From"], msg["To"] = self.sender, self.recipient
+        msg["Subject"] = f"Appointment reminder for {message['name']}"
+        msg.set_content(message["text"])
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(msg)
+
+def _appt_start(appt):
+    return datetime.datetime.strptime(appt["date"] + " " + appt["time"], "%Y-%m-%d %H:%M")
+
+class ReminderScheduler:
+    """Fires reminders for upcoming appointments into an outbox. Use the shared reminders instance."""
+
+    def __init__(self, outbox, leads=REMINDER_LEADS, window_days=REMINDER_WINDOW_DAYS):
+        self.outbox = outbox
+        self.leads = leads
+        self.window_days = window_days
+        self.heap = []
+        self.pending = {}     # key -> (seq, appointment)
+        self.seq = 0
+        self.horizon = None   # reminders firing at or after this are not scheduled yet
+
+    def _push(self, key, fire, appt):
+        self.seq += 1
+        self.pending[key] = (self.seq, appt)
+        heapq.heappush(self.heap, (fire, self.seq, key))
+
+    def _schedule(self, appt, earliest, catch_up=False):
+        start = _appt_start(appt)
+        overdue = None
+        for lead in self.leads:
+            fire = start - datetime.timedelta(minutes=lead)
+            if earliest <= fire < self.horizon:
+                self._push((str(appt["id"]), lead), fire, dict(appt))
+            elif catch_up and fire < earliest < start and (overdue is None or lead < overdue):
+                overdue = lead
+        if overdue is not None:
+            # missed while the app was closed: send the closest one now; the outbox key stops repeats
+            self._push((str(appt["id"]), overdue), earliest, dict(appt))
+
+    def _cancel(self, appt_id):
+        for lead in self.leads:
+            self.pending.pop((str(appt_id), lead), None)
+
+    def _scan(self, earliest, now, catch_up=False):
+        """Schedule every reminder firing between earliest and the horizon."""
+        latest = self.horizon + datetime.timedelta(minutes=max(self.leads))
+        for appt in appointments_between(earliest.date().isoformat(), latest.date().isoformat()):
+            self._schedule(appt, max(earliest, now), catch_up)
+
+    def rebuild(self, now=None, catch_up=False):
+        """Start over from the appointments, keeping only reminders still to come inside the window.
+
+        With catch_up (at startup), appointments that have not started yet but whose
+        reminder came due while the app was closed get that reminder right away.
+        """
+        now = now or datetime.datetime.now()
+        self.heap, self.pending = [], {}
+        self.horizon = datetime.datetime.combine(now.date() + datetime.timedelta(days=self.window_days + 1), datetime.time())
+        self._scan(now, now, catch_up)
+
+    def roll(self, now=None):
+        """Move the horizon forward to keep REMINDER_WINDOW_DAYS ahead of now."""
+        now = now or datetime.datetime.now()
+        target = datetime.datetime.combine(now.date() + datetime.timedelta(days=self.window_days + 1), datetime.time())
+        if self.horizon is not None and target > self.horizon:
+            old, self.horizon = self.horizon, target
+            self._scan(old, now)
+
+    def fire_due(self, now=None):
+        """Send every reminder that is due; returns how many were sent (not counting ones an outbox already had)."""
+        now = now or datetime.datetime.now()
+        sent = 0
+        while self.heap and self.heap[0][0] <= now:
+            fire, seq, key = heapq.heappop(self.heap)
+            entry = self.pending.get(key)
+            if entry is None or entry[0] != seq:
+                continue   # cancelled or rescheduled since it was pushed
+            appt = entry[1]
+            # the slot is part of the key: only a re-send of this very reminder after a restart is deduplicated
+            slot = appt["date"] + "T" + appt["time"].replace(":", "")
+            message = {"key": f"{key[0]}_{slot}_{key[1]}", "appointment": key[0], "name": appt["name"], "staff": appt["staff"],
+                       "services": appt["services"], "date": appt["date"], "time": appt["time"], "lead_minutes": key[1],
+                       "text": f"Hi {appt['name']}, a reminder of your {', '.join(appt['services'])} appointment "
+                               f"on {appt['date']} at {appt['time']} with {appt['staff']}."}
+            try:
+                delivered = self.outbox.send(message) is not False
+            except OSError:
+                self._push(key, now + datetime.timedelta(minutes=REMINDER_RETRY_MINUTES), appt)
+                continue
+            del self.pending[key]
+            sent += delivered
+        return sent
+
+    # event handlers; ignored until the first rebuild()
+    def on_added(self, appt):
+        if self.horizon is not None:
+            self._schedule(appt, datetime.datetime.now())
+
+    def on_updated(self, appt):
+        if self.horizon is not None:
+            self._cancel(appt["id"])
+            self._schedule(appt, datetime.datetime.now())
+
+    def on_removed(self, appt):
+        self._cancel(appt["id"])
+
+    def on_reloaded(self):
+        if self.horizon is not None:
+            self.rebuild()
+
+    def on_recurring_changed(self):
+        if self.horizon is None:
+            return
+        for key in [k for k in self.pending if k[0].startswith("R")]:
+            del self.pending[key]
+        now = datetime.datetime.now()
+        latest = self.horizon + datetime.timedelta(minutes=max(self.leads))
+        for occ in iter_occurrences(now.date().isoformat(), latest.date().isoformat()):
+            self._schedule(occ, now)
+
+reminders = ReminderScheduler(SpoolOutbox())
+subscribe("appointment_added", reminders.on_added)
+subscribe("appointment_updated", reminders.on_updated)
+subscribe("appointment_removed", reminders.on_removed)
+subscribe("appointments_reloaded", reminders.on_reloaded)
+subscribe("recurring_changed", reminders.on_recurring_changed)
+
+# ----------------- Occupancy -----------------
+# Booked minutes per (day of month, slot, staff, service), one NumPy array per
+# month. The part that comes from a closed month's archive segment is built
+# once and kept in OCCUPANCY_DIR, stamped with the segment's size and mtime.
+# Hot appointments and recurring occurrences are added when a month is first
+# used; after that each booking change adds or subtracts that appointment's
+# minutes, so queries never rescan the appointment lists.
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+def _appointment_cells(appt):
+    """(slot, service, minutes) for each slot the appointment's services occupy, in order."""
+    cells = []
+    start = time_to_minutes(appt["time"])
+    for service in appt["services"]:
+        end = min(start + service_duration.get(service, 30), 24 * 60)
+        m = start
+        while m < end:
+            slot_end = (m // SLOT_MINUTES + 1) * SLOT_MINUTES
+            cells.append((m // SLOT_MINUTES, service, min(end, slot_end) - m))
+            m = slot_end
+        start = end
+    return cells
+
+def _occupancy_path(month):
+    return os.path.join(OCCUPANCY_DIR, f"occupancy_{month}.npz")
+
+def _month_days(month):
+    return calendar.monthrange(int(month[:4]), int(month[5:7]))[1]
+
+def _months_between(first, last):
+    """The "YYYY-MM" months touched by the dates first..last."""
+    y, m = int(first[:4]), int(first[5:7])
+    months = []
+    while f"{y}-{m:02d}" <= last[:7]:
+        months.append(f"{y}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return months
+
+class OccupancyCube:
+    """Per-month occupancy arrays with shared staff and service axes. Use the shared occupancy instance."""
+
+    def __init__(self):
+        self.staff, self.services = [], []
+        self.staff_pos, self.service_pos = {}, {}
+        self.months = {}     # "YYYY-MM" -> uint16 array [day, slot, staff, service]
+        self.booked = None   # hot appointment id -> (date, time, staff, services) as counted
+
+    def _axis(self, names, pos, name, axis):
+        i = pos.get(name)
+        if i is None:
+            i = pos[name] = len(names)
+            names.append(name)
+            widths = [(0, 0)] * 4
+            widths[axis] = (0, 1)
+            for month, cube in self.months.items():
+                self.months[month] = np.pad(cube, widths)
+        return i
+
+    def _staff(self, name):
+        return self._axis(self.staff, self.staff_pos, name, 2)
+
+    def _service(self, name):
+        return self._axis(self.services, self.service_pos, name, 3)
+
+    def _fill(self, month, appts, sign=1):
+        """Add (or with sign=-1 subtract) the appointments' minutes to a loaded month."""
+        days, slots, staff, services, minutes = [], [], [], [], []
+        for a in appts:
+            day = int(a["date"][8:10]) - 1
+            s = self._staff(a["staff"])
+            for slot, service, mins in _appointment_cells(a):
+                days.append(day); slots.append(slot); staff.append(s)
+                services.append(self._service(service)); minutes.append(mins)
+        if not days:
+            return
+        # only the touched cells are read and written, clamped to the uint16 range
+        cube = self.months[month]
+        cells, where = np.unique(np.ravel_multi_index((days, slots, staff, services), cube.shape), return_inverse=True)
+        change = np.bincount(where, weights=minutes).astype(np.int64)
+        flat = cube.reshape(-1)   # a view: the month arrays are always C-contiguous
+        flat[cells] = np.clip(flat[cells].astype(np.int64) + sign * change, 0, np.iinfo(np.uint16).max)
+
+    def _empty(self, month):
+        return np.zeros((_month_days(month), SLOTS_PER_DAY, len(self.staff), len(self.services)), np.uint16)
+
+    def _archived_part(self, month):
+        """The month's archived appointments as (cube, staff names, service names), from OCCUPANCY_DIR when fresh."""
+        try:
+            st = os.stat(_segment_path("appointments", month, "csv.gz"))
+        except OSError:
+            return None
+        stamp = [OCCUPANCY_VERSION, st.st_size, st.st_mtime_ns]
+        try:
+            with np.load(_occupancy_path(month), allow_pickle=False) as f:
+                if f["stamp"].tolist() == stamp:
+                    return f["cube"], f["staff"].tolist(), f["services"].tolist()
+        except (OSError, KeyError, ValueError):
+            pass
+        part = OccupancyCube()
+        part.months[month] = part._empty(month)
+        part._fill(month, ({"date": r["Date"], "time": r["Time"], "staff": r["Staff"],
+                            "services": r["Services"].split(";") if r["Services"] else []}
+                           for r in iter_segment_rows("appointments", month)))
+        os.makedirs(OCCUPANCY_DIR, exist_ok=True)
+        tmp = _occupancy_path(month) + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, cube=part.months[month], staff=np.array(part.staff, dtype=str),
+                                services=np.array(part.services, dtype=str), stamp=np.array(stamp, dtype=np.int64))
+        os.replace(tmp, _occupancy_path(month))
+        return part.months[month], part.staff, part.services
+
+    def _track(self):
+        if self.booked is None:
+            self.booked = {a["id"]: (a["date"], a["time"], a["staff"], tuple(a["services"])) for a in Appointments}
+
+    def month(self, month):
+        """The loaded array for "YYYY-MM", building it on first use."""
+        cube = self.months.get(month)
+        if cube is not None:
+            return cube
+        self._track()
+        archived = self._archived_part(month)
+        if archived is not None:
+            stored, staff, services = archived
+            s_idx = np.array([self._staff(n) for n in staff], dtype=np.intp)
+            v_idx = np.array([self._service(n) for n in services], dtype=np.intp)
+        self.months[month] = self._empty(month)
+        if archived is not None and stored.size:
+            self.months[month][:, :, s_idx[:, None], v_idx[None, :]] = stored
+        last = f"{month}-{_month_days(month):02d}"
+        self._fill(month, [a for a in Appointments if a["date"].startswith(month)])
+        self._fill(month, iter_occurrences(month + "-01", last))
+        return self.months[month]
+
+    def _count(self, appt, sign):
+        month = appt["date"][:7]
+        if month in self.months:
+            self._fill(month, [appt], sign)
+
+    # event handlers
+    def on_added(self, appt):
+        if self.booked is not None:
+            self.booked[appt["id"]] = (appt["date"], appt["time"], appt["staff"], tuple(appt["services"]))
+            self._count(appt, 1)
+
+    def on_updated(self, appt):
+        if self.booked is not None:
+            old = self.booked.get(appt["id"])
+            if old is not None:
+                self._count(dict(zip(("date", "time", "staff", "services"), old)), -1)
+            self.on_added(appt)
+
+    def on_removed(self, appt):
+        if self.booked is not None:
+            old = self.booked.pop(appt["id"], None)
+            if old is not None:
+                self._count(dict(zip(("date", "time", "staff", "services"), old)), -1)
+
+    def on_reloaded(self):
+        """Drop the loaded months; they are rebuilt (from OCCUPANCY_DIR where possible) on next use."""
+        self.months, self.booked = {}, None
+
+    def _days(self, first, last, staff=None, service=None):
+        """Booked minutes per day and slot for first..last ("YYYY-MM-DD"), as (dates, array [day, slot])."""
+        dates, blocks = [], []
+        for month in _months_between(first, last):
+            cube = self.month(month)
+            lo = int(first[8:10]) - 1 if month == first[:7] else 0
+            hi = int(last[8:10]) if month == last[:7] else cube.shape[0]
+            cube = cube[lo:hi]
+            if staff is not None:
+                cube = cube[:, :, [self.staff_pos[staff]]] if staff in self.staff_pos else cube[:, :, :0]
+            if service is not None:
+                cube = cube[:, :, :, [self.service_pos[service]]] if service in self.service_pos else cube[:, :, :, :0]
+            blocks.append(cube.sum(axis=(2, 3), dtype=np.int64))
+            dates.extend(datetime.date(int(month[:4]), int(month[5:7]), d + 1) for d in range(lo, hi))
+        return dates, np.concatenate(blocks) if blocks else np.zeros((0, SLOTS_PER_DAY), np.int64)
+
+    def weekday_profile(self, first, last, staff=None, service=None):
+        """Average busy chairs per weekday (Mon=0) and slot over first..last, as a float array [7, slot]."""
+        dates, minutes = self._days(first, last, staff, service)
+        weekdays = np.array([d.weekday() for d in dates], dtype=np.intp)
+        totals = np.zeros((7, SLOTS_PER_DAY))
+        np.add.at(totals, weekdays, minutes)
+        days = np.bincount(weekdays, minlength=7)[:, None]
+        return totals / np.maximum(days, 1) / SLOT_MINUTES
+
+    def forecast_week(self, start, weeks=OCCUPANCY_FORECAST_WEEKS, staff=None, service=None):
+        """Expected busy chairs per slot for the 7 days from start (datetime.date), as a float array [7, slot].
+
+        Each day is the same weekday over the previous weeks, weighted towards recent
+        weeks by OCCUPANCY_FORECAST_DECAY, and never less than what is already booked.
+        """
+        first = start - datetime.timedelta(weeks=weeks)
+        last = start + datetime.timedelta(days=6)
+        _, minutes = self._days(first.isoformat(), last.isoformat(), staff, service)
+        history = minutes[:7 * weeks].reshape(weeks, 7, SLOTS_PER_DAY)
+        weights = OCCUPANCY_FORECAST_DECAY ** np.arange(weeks - 1, -1, -1, dtype=float)
+        expected = np.tensordot(weights, history, axes=1) / weights.sum()
+        return np.maximum(expected, minutes[7 * weeks:]) / SLOT_MINUTES
+
+occupancy = OccupancyCube()
+if NUMPY_AVAILABLE:
+    subscribe("appointment_added", occupancy.on_added)
+    subscribe("appointment_updated", occupancy.on_updated)
+    subscribe("appointment_removed", occupancy.on_removed)
+    subscribe("appointments_reloaded", occupancy.on_reloaded)
+    subscribe("recurring_changed", occupancy.on_reloaded)
+
+# ----------------- Booking Audit -----------------
+# One sort of every appointment by (staff, start, end), then a sweep per staff
+# member with a heap of the bookings still running: each new booking overlaps
+# exactly the ones left in the heap, and the heap size is the staff member's
+# load at that moment. O(n log n) plus the number of overlaps reported.
+STAFF_CAPACITY = 1   # clients one staff member can serve at the same time
+AUDIT_SHOW_LIMIT = 500   # entries per section shown on screen
+
+def _audit_appointments():
+    """Archived and stored appointments, plus recurring occurrences up to the latest of them."""
+    horizon = (datetime.date.today() + datetime.timedelta(days=RECURRING_VIEW_DAYS)).isoformat()
+    horizon = max([horizon] + [a["date"] for a in Appointments])
+    starts = [r["start"] for r in load_recurring()]
+    occurrences = iter_occurrences(min(starts), horizon) if starts else ()
+    return chain(iter_archived_appointments(), list(Appointments), occurrences)
+
+def _audit_time(minute, dates):
+    day, m = divmod(minute, 24 * 60)
+    return f"{dates.get(day) or datetime.date.fromordinal(day).isoformat()} {m // 60:02d}:{m % 60:02d}"
+
+def audit_bookings(appts=None, capacity=STAFF_CAPACITY):
+    """Check assigned appointments (all of them if None) for double bookings, overload and skills.
+
+    Returns {"checked": n, "overlaps": [(staff, id, id, from, to)],
+    "over_capacity": [(staff, from, to, peak)], "skills": [(id, name, staff, missing services)]},
+    times as "YYYY-MM-DD HH:MM".
+    """
+    skills = staff_skills()
+    ordinals, dates, gaps = {}, {}, {}   # date -> ordinal, ordinal -> date, (staff, services) -> missing skills
+    rows, mismatches = [], []
+    for a in _audit_appointments() if appts is None else appts:
+        if a["staff"] == "Not Assigned":
+            continue   # nobody to double-book yet
+        day = ordinals.get(a["date"])
+        if day is None:
+            day = ordinals[a["date"]] = datetime.date.fromisoformat(a["date"]).toordinal()
+            dates[day] = a["date"]
+        start = day * 24 * 60 + time_to_minutes(a["time"])
+        rows.append((a["staff"], start, start + total_time(a["services"]), str(a["id"])))
+        key = (a["staff"], tuple(a["services"]))
+        missing = gaps.get(key)
+        if missing is None:
+            known = skills.get(a["staff"])
+            missing = gaps[key] = [s for s in a["services"] if known is None or s.lower() not in known]
+        if missing:
+            mismatches.append((str(a["id"]), a["name"], a["staff"], missing))
+    rows.sort()
+
+    overlaps, overloaded = [], []
+    staff, running, run = None, [], None   # run: [staff, from, to, peak] while over capacity
+    for name, start, end, appt_id in rows:
+        if name != staff:
+            staff, running = name, []
+        while running and running[0][0] <= start:
+            heapq.heappop(running)
+        for other_end, other_id in running:
+            overlaps.append((name, other_id, appt_id, _audit_time(start, dates), _audit_time(min(end, other_end), dates)))
+        heapq.heappush(running, (end, appt_id))
+        load = len(running)
+        if load > capacity:
+            # the load falls back to capacity when the (load - capacity)-th earliest running booking ends
+            until = running[0][0] if load == capacity + 1 else heapq.nsmallest(load - capacity, running)[-1][0]
+            if run is not None and run[0] == name and start < run[2]:
+                run[2], run[3] = max(run[2], until), max(run[3], load)
+            else:
+                if run is not None:
+                    overloaded.append(run)
+                run = [name, start, until, load]
+    if run is not None:
+        overloaded.append(run)
+    return {"checked": len(rows), "overlaps": overlaps,
+            "over_capacity": [(s, _audit_time(a, dates), _audit_time(b, dates), peak) for s, a, b, peak in overloaded],
+            "skills": mismatches}
+
+def format_audit(result, limit=None):
+    """The audit as report lines; each section is cut to limit entries if given."""
+    lines = [f"Booking Audit - {result['checked']} appointment(s) checked",
+             f"Overlapping bookings: {len(result['overlaps'])}",
+             f"Staff over capacity: {len(result['over_capacity'])} period(s)",
+             f"Skill mismatches: {len(result['skills'])}", ""]
+    sections = [
+        ("Overlapping bookings (staff | appointment | appointment | overlap)", result["overlaps"],
+         lambda o: f"{o[0]} | #{o[1]} | #{o[2]} | {o[3]} - {o[4][11:] if o[4][:10] == o[3][:10] else o[4]}"),
+        (f"Over capacity (more than {STAFF_CAPACITY} client(s) at once)", result["over_capacity"],
+         lambda o: f"{o[0]} | {o[1]} - {o[2]} | up to {o[3]} clients"),
+        ("Skill mismatches (appointment | customer | staff | not in their skills)", result["skills"],
+         lambda o: f"#{o[0]} | {o[1]} | {o[2]} | {', '.join(o[3])}"),
+    ]
+    for title, entries, fmt in sections:
+        if not entries:
+            continue
+        lines.append(title + ":")
+        lines.extend(fmt(e) for e in islice(entries, limit))
+        if limit is not None and len(entries) > limit:
+            lines.append(f"... {len(entries) - limit} more")
+        lines.append("")
+    return lines
+
+# ----------------- Staff Analytics -----------------
+# Per-staff monthly figures. Closed months never change, so they are kept in
+# STAFF_ROLLUP_FILE and only the current month is recomputed on each request.
+# Edits to history mark just the months they touch as stale; the next request
+# recomputes those months and no others.
+def booked_staff_minutes(months=None):
+    """Return {month: {staff: booked minutes}} for the given months (all if None)."""
+    booked = {}
+    # archived months come straight from the segment summaries
+    for month in archived_months("appointments"):
+        if months is None or month in months:
+            per_staff = booked.setdefault(month, Counter())
+            per_staff.update(segment_summary("appointments", month)["staff_minutes"])
+    # recurring series count up to the end of the current month
+    today = datetime.date.today()
+    horizon = _add_months(today.replace(day=1), 1) - datetime.timedelta(days=1)
+    for a in chain(Appointments, iter_occurrences("0001-01-01", horizon.isoformat())):
+        month = a["date"][:7]
+        if months is None or month in months:
+            booked.setdefault(month, Counter())[a["staff"]] += total_time(a["services"])
+    return booked
+
+def compute_staff_rollups(months=None):
+    """Return {month: {staff: {"minutes", "revenue", "bills", "salary"}}} for the given months (all if None)."""
+    salaries = dict(zip(staffNames, staffSalaries))
+    rollups = {}
+    def entry(month, staff):
+        per_staff = rollups.setdefault(month, {})
+        if staff not in per_staff:
+            per_staff[staff] = {"minutes": 0, "revenue": 0.0, "bills": 0, "salary": salaries.get(staff, 0)}
+        return per_staff[staff]
+    for month, per_staff in booked_staff_minutes(months).items():
+        for staff, minutes in per_staff.items():
+            entry(month, staff)["minutes"] += minutes
+    for month in archived_months("bills"):
+        if months is None or month in months:
+            summary = segment_summary("bills", month)
+            for staff, revenue in summary["staff_revenue"].items():
+                e = entry(month, staff)
+                e["revenue"] += revenue
+                e["bills"] += summary["staff_counts"].get(staff, 0)
+    if os.path.exists(BILL_FILE):
+        for date, staff, final in scan_csv(BILL_FILE, ["Date", "Staff", "Final"], {"Final": float}):
+            month = date[:7]
+            if not month or final is None or (months is not None and month not in months):
+                continue
+            e = entry(month, staff)
+            e["revenue"] += final
+            e["bills"] += 1
+    return rollups
+
+def _read_rollup_store():
+    try:
+        with open(STAFF_ROLLUP_FILE, encoding="utf-8") as f:
+            store = json.load(f)
+        if store.get("version") == 2:
+            store.setdefault("stale", [])
+            return store
+    except (OSError, ValueError):
+        pass
+    return {"version": 2, "closed_through": "", "months": {}, "stale": []}
+
+def _write_rollup_store(store):
+    tmp = STAFF_ROLLUP_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(store, f)
+    os.replace(tmp, STAFF_ROLLUP_FILE)
+
+def invalidate_staff_rollups(months=None):
+    """Mark stored rollups for the given months stale, or drop all of them, after history is edited."""
+    if not os.path.exists(STAFF_ROLLUP_FILE):
+        return
+    if months is None:
+        os.remove(STAFF_ROLLUP_FILE)
+        return
+    store = _read_rollup_store()
+    dropped = {m for m in months if m and m < store["closed_through"]} - set(store["stale"])
+    if dropped:
+        for m in dropped:
+            store["months"].pop(m, None)
+        store["stale"] = sorted(set(store["stale"]) | dropped)
+        _write_rollup_store(store)
+
+def staff_monthly_rollups():
+    """Rollups for every month: stored ones for closed months, live ones for the current month."""
+    current = datetime.date.today().strftime("%Y-%m")
+    store = _read_rollup_store()
+    closed_through = store["closed_through"]
+    if not closed_through:
+        # first run: close every finished month in one pass
+        fresh = compute_staff_rollups()
+        todo = [m for m in fresh if m < current]
+    else:
+        # months finished since the last request, plus the ones edited since they were closed
+        todo = set(store["stale"]) | {m for m in _months_between(closed_through + "-01", current + "-01") if m < current}
+        fresh = compute_staff_rollups(todo | {current})
+    if todo or closed_through != current:
+        for month in todo:
+            store["months"][month] = fresh.get(month, {})
+        store["closed_through"], store["stale"] = current, []
+        _write_rollup_store(store)
+    rollups = dict(store["months"])
+    rollups[current] = fresh.get(current, {})
+    return rollups
+
+# Appointment id -> month it was last counted in, so a reschedule can also
+# mark the month it moved out of. Filled on the first booking event.
+_rollup_months = {}
+
+def _invalidate_changed_rollups():
+    """Mark stale the closed months whose booked minutes differ from what is stored."""
+    if not os.path.exists(STAFF_ROLLUP_FILE):
+        return
+    store = _read_rollup_store()
+    booked = booked_staff_minutes()
+    changed = []
+    for month in set(store["months"]) | {m for m in booked if m < store["closed_through"]}:
+        stored = {s: e["minutes"] for s, e in store["months"].get(month, {}).items() if e["minutes"]}
+        if stored != {s: m for s, m in booked.get(month, {}).items() if m}:
+            changed.append(month)
+    invalidate_staff_rollups(changed)
+
+def _rollups_on_put(appt):
+    if not _rollup_months:
+        # first event: the old month of an updated appointment is not known
+        _rollup_months.update((a["id"], a["date"][:7]) for a in Appointments)
+        _invalidate_changed_rollups()
+        return
+    old = _rollup_months.get(appt["id"])
+    _rollup_months[appt["id"]] = appt["date"][:7]
+    invalidate_staff_rollups({old, appt["date"][:7]})
+
+def _rollups_on_removed(appt):
+    invalidate_staff_rollups({_rollup_months.pop(appt["id"], None), appt["date"][:7]})
+
+def _rollups_on_reloaded():
+    _rollup_months.clear()
+    _rollup_months.update((a["id"], a["date"][:7]) for a in Appointments)
+    _invalidate_changed_rollups()
+
+subscribe("appointment_added", _rollups_on_put)
+subscribe("appointment_updated", _rollups_on_put)
+subscribe("appointment_removed", _rollups_on_removed)
+subscribe("appointments_reloaded", _rollups_on_reloaded)
+subscribe("recurring_changed", _invalidate_changed_rollups)
+
+# ----------------- Bulk Checkout -----------------
+# Discount rules: {"default": pct, "services": {service: pct}, "customers": {name: pct}}.
+# Each service line gets the largest percentage that applies to it.
+def load_discount_rules():
+    try:
+        with open(DISCOUNT_RULES_FILE, encoding="utf-8") as f:
+            rules = json.load(f)
+    except (OSError, ValueError):
+        rules = {}
+    return {"default": float(rules.get("default", 0)),
+            "services": dict(rules.get("services", {})),
+            "customers": dict(rules.get("customers", {}))}
+
+def save_discount_rules(rules):
+    with open(DISCOUNT_RULES_FILE, "w", encoding="utf-8") as f:
+        json.dump(rules, f, indent=2)
+
+def billed_ids(appointment_ids):
+    """The ids among appointment_ids that already have a bill, whatever day it was saved on."""
+    wanted = {str(i) for i in appointment_ids}
+    if not wanted:
+        return set()
+    found = set()
+    if os.path.exists(BILL_FILE):
+        found.update(bill_id for bill_id, in scan_csv(BILL_FILE, ["ID"]) if bill_id in wanted)
+    return found | archived_billed_ids(wanted - found)
+
+def unbilled_appointments(date):
+    appts = appointments_between(date, date)
+    done = billed_ids(a["id"] for a in appts)
+    return [a for a in appts if str(a["id"]) not in done]
+
+def price_checkout(appts, rules):
+    """Return (appointment, total, discount_amt, final_amt) for each appointment under the rules."""
+    default = rules["default"]
+    by_service = {k.lower(): v for k, v in rules["services"].items()}
+    by_customer = {k.lower(): v for k, v in rules["customers"].items()}
+    bills = []
+    for a in appts:
+        customer_pct = max(default, by_customer.get(a["name"].lower(), 0))
+        total = discount = 0.0
+        for s in a["services"]:
+            price = services_catalog.get(s, 0)
+            total += price
+            discount += price * max(customer_pct, by_service.get(s.lower(), 0)) / 100.0
+        discount = round(discount, 2)
+        bills.append((a, float(total), discount, round(total - discount, 2)))
+    return bills
+
 # ----------------- PDF helpers (reportlab) -----------------
-def create_invoice_pdf(path, appointment, total, discount_amt, final_amt):
-    if not REPORTLAB_AVAILABLE:
-        raise RuntimeError("reportlab not installed")
+# Builders take a file path or any writable binary stream; the render_*
+# variants return the PDF as bytes. Logos are handled in memory.
+_default_logo = {}
 
-    c = canvas.Canvas(path, pagesize=A4)
+def load_invoice_logo(source=None):
+    """Return (image, width, height) for the invoice logo scaled to 80 mm wide, or None.
+
+    source may be image bytes, a binary stream or a PIL image; None reads
+    LOGO_PATH once and reuses it while the file is unchanged. The logo is
+    downsampled to INVOICE_LOGO_DPI, flattened onto white and JPEG encoded
+    once, so every invoice embeds the same small image.
+    """
+    if not PIL_AVAILABLE:
+        return None
+    if source is None:
+        try:
+            mtime = os.stat(LOGO_PATH).st_mtime_ns
+        except OSError:
+            return None
+        if _default_logo.get("mtime") != mtime:
+            with open(LOGO_PATH, "rb") as f:
+                _default_logo["logo"] = load_invoice_logo(f.read())
+            _default_logo["mtime"] = mtime
+        return _default_logo["logo"]
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    img = source if isinstance(source, Image.Image) else Image.open(source)
+    img_w, img_h = img.size
+    draw_w = 80 * mm
+    draw_h = img_h * draw_w / img_w
+    px_w = int(draw_w / 72 * INVOICE_LOGO_DPI)
+    px_h = max(1, int(img_h * px_w / img_w))
+    resized = img.convert("RGBA").resize((px_w, px_h), Image.LANCZOS)
+    flat = Image.new("RGB", resized.size, "white")
+    flat.paste(resized, mask=resized.getchannel("A"))
+    jpeg = BytesIO()
+    flat.save(jpeg, "JPEG", quality=INVOICE_LOGO_QUALITY, optimize=True)
+    jpeg.seek(0)
+    return ImageReader(jpeg), draw_w, draw_h
+
+def _define_invoice_template(c, logo):
+    """Record the static invoice parts (logo, title, rule, footer) as a reusable form."""
     width, height = A4
 
     margin = 20 * mm
@@ -160,21 +2130,17 @@ def create_invoice_pdf(path, appointment, total, discount_amt, final_amt):
     x_right = width - margin
     y = height - margin
 
+    c.beginForm("invoice_template")
     # ----------------------------------------------------------
     # 1. LOGO (Top Right)
     # ----------------------------------------------------------
-    if PIL_AVAILABLE and os.path.exists(LOGO_PATH):
-        try:
-            img = Image.open(LOGO_PATH)
-            img_w, img_h = img.size
-            scale = (80 * mm) / img_w
-            resized = img.resize((int(img_w * scale), int(img_h * scale)))
-            temp_logo_path = path + "_tmp_logo.png"
-            resized.save(temp_logo_path)
-            c.drawImage(temp_logo_path, x_right - (img_w * scale), y - 40 * mm, mask='auto')
-            os.remove(temp_logo_path)
-        except Exception:
-            pass
+    try:
+        logo_img = load_invoice_logo(logo)
+        if logo_img:
+            image, logo_w, logo_h = logo_img
+            c.drawImage(image, x_right - logo_w, y - 40 * mm, logo_w, logo_h)
+    except Exception:
+        pass
 
     # ----------------------------------------------------------
     # 2. TITLE
@@ -185,6 +2151,21 @@ def create_invoice_pdf(path, appointment, total, discount_amt, final_amt):
     # Horizontal line
     c.line(x_left, y - 28, x_right, y - 28)
 
+    # ----------------------------------------------------------
+    # 6. FOOTER
+    # ----------------------------------------------------------
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawString(x_left, 30, "Thank you for choosing BellaDesk Beauty Studio!")
+    c.drawString(x_left, 18, "This is a computer generated invoice.")
+    c.endForm()
+
+def _draw_invoice_body(c, appointment, total, discount_amt, final_amt):
+    width, height = A4
+
+    margin = 20 * mm
+    x_left = margin
+    y = height - margin
+
     # ----------------------------------------------------------
     # 3. CUSTOMER DETAILS
     # ----------------------------------------------------------
@@ -195,7 +2176,7 @@ def create_invoice_pdf(path, appointment, total, discount_amt, final_amt):
         ("Invoice Date", datetime.date.today().strftime("%Y-%m-%d")),
         ("Customer", appointment["name"]),
         ("Appointment ID", str(appointment["id"])),
-        ("Staff", appointment["staff"]),
+        ("Staff", appointment.get("staff", "Not Assigned")),
         ("Date & Time", f"{appointment['date']} {appointment['time']}")
     ]
 
@@ -231,28 +2212,77 @@ def create_invoice_pdf(path, appointment, total, discount_amt, final_amt):
     y_info -= 14
     c.drawString(x_left, y_info, f"Final Payable: Rupees {final_amt:.2f}")
 
-    # ----------------------------------------------------------
-    # 6. FOOTER
-    # ----------------------------------------------------------
-    c.setFont("Helvetica-Oblique", 9)
-    c.drawString(x_left, 30, "Thank you for choosing BellaDesk Beauty Studio!")
-    c.drawString(x_left, 18, "This is a computer generated invoice.")
-
-    # Final save
-    c.showPage()
-    c.save()
+def create_invoices_pdf(path, invoices, logo=None):
+    """Write one page per (appointment, total, discount_amt, final_amt) into a single PDF.
 
-def create_daily_report_pdf(path, report_date, rows, totals):
+    All pages share one copy of the logo and the static page template.
+    """
     if not REPORTLAB_AVAILABLE:
         raise RuntimeError("reportlab not installed")
-    c = canvas.Canvas(path, pagesize=A4)
+
+    c = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+    _define_invoice_template(c, logo)
+    for appointment, total, discount_amt, final_amt in invoices:
+        c.doForm("invoice_template")
+        _draw_invoice_body(c, appointment, total, discount_amt, final_amt)
+        c.showPage()
+    c.save()
+
+def create_invoice_pdf(path, appointment, total, discount_amt, final_amt, logo=None):
+    create_invoices_pdf(path, [(appointment, total, discount_amt, final_amt)], logo=logo)
+
+def render_invoice_pdf(appointment, total, discount_amt, final_amt, logo=None):
+    """Build an invoice in memory and return the PDF bytes."""
+    buf = BytesIO()
+    create_invoice_pdf(buf, appointment, total, discount_amt, final_amt, logo=logo)
+    return buf.getvalue()
+
+def daily_report_totals(rows):
+    """Income, customer count and top service/staff for a list of bill rows."""
+    totals = {"income": 0.0, "customers": 0}
+    service_counter = Counter()
+    staff_counter = Counter()
+    for row in rows:
+        try:
+            totals["income"] += float(row.get("Final",0))
+            totals["customers"] += 1
+        except:
+            pass
+        for s in row.get("Services","").split(";"):
+            service_counter[s.strip()] += 1
+        staff_counter[row.get("Staff","")] += 1
+    totals["top_service"] = service_counter.most_common(1)[0][0] if service_counter else "-"
+    totals["top_staff"] = staff_counter.most_common(1)[0][0] if staff_counter else "-"
+    totals["service_counts"] = service_counter
+    totals["staff_counts"] = staff_counter
+    return totals
+
+# Layout of the daily report table, shared by the drawing code and the page counter
+REPORT_TABLE_TOP = 112    # distance of the first table row below the top margin
+REPORT_ROW_STEP = 12
+REPORT_BOTTOM = 60
+
+def _lines_page_count(n_lines, first_y, top_y, step=REPORT_ROW_STEP, bottom=REPORT_BOTTOM):
+    """Pages used by n_lines drawn from first_y down, continuing from top_y on new pages."""
+    on_first = int((first_y - bottom) // step) + 1
+    if n_lines <= on_first:
+        return 1
+    per_page = int((top_y - bottom) // step) + 1
+    return 1 + -(-(n_lines - on_first) // per_page)
+
+def daily_report_page_count(n_rows):
+    height = A4[1]
+    top = height - 20*mm
+    return _lines_page_count(n_rows, top - REPORT_TABLE_TOP, top)
+
+def _draw_daily_report(c, report_date, rows, totals, title="BellaDesk Daily Report"):
     width, height = A4
     margin = 20*mm
     x = margin
     y = height - margin
 
     c.setFont("Helvetica-Bold", 16)
-    c.drawString(x, y - 10, f"BellaDesk Daily Report - {report_date}")
+    c.drawString(x, y - 10, f"{title} - {report_date}")
     c.setFont("Helvetica", 10)
     y_line = y - 40
     c.drawString(x, y_line, f"Total Income: Rs {totals['income']:.2f}")
@@ -274,34 +2304,653 @@ def create_daily_report_pdf(path, report_date, rows, totals):
     c.drawString(x+40, y_line, "Name")
     c.drawString(x+200, y_line, "Services")
     c.drawString(x+420, y_line, "Final")
-    y_line -= 12
+    y_line -= REPORT_ROW_STEP
     c.setFont("Helvetica", 9)
     for r in rows:
+        if y_line < REPORT_BOTTOM:
+            c.showPage()
+            c.setFont("Helvetica", 9)
+            y_line = height - margin
         c.drawString(x, y_line, str(r.get("ID","")))
         c.drawString(x+40, y_line, str(r.get("Name",""))[:20])
         c.drawString(x+200, y_line, str(r.get("Services",""))[:30])
         c.drawString(x+420, y_line, str(r.get("Final","")))
-        y_line -= 12
-        if y_line < 60:
-            c.showPage()
-            y_line = height - margin
+        y_line -= REPORT_ROW_STEP
+
+    c.showPage()
+
+def create_daily_report_pdf(path, report_date, rows, totals):
+    if not REPORTLAB_AVAILABLE:
+        raise RuntimeError("reportlab not installed")
+    c = canvas.Canvas(path, pagesize=A4)
+    _draw_daily_report(c, report_date, rows, totals)
+    c.save()
+
+def render_daily_report_pdf(report_date, rows, totals):
+    """Build a daily report in memory and return the PDF bytes."""
+    buf = BytesIO()
+    create_daily_report_pdf(buf, report_date, rows, totals)
+    return buf.getvalue()
+
+# ----------------- Range Reports -----------------
+# Month-end reports: the ledger is partitioned by date in one scan, each day's
+# totals and page count are worked out up front, and all days are drawn into a
+# single PDF behind a summary page and table of contents. Drawing dominates and
+# has to happen on one canvas, so everything runs in-process.
+def partition_bills_by_date(first, last):
+    by_date = {}
+    for row in iter_bill_rows(first, last):
+        by_date.setdefault(row["Date"], []).append(row)
+    return by_date
+
+def _build_report_section(date, rows):
+    return {"date": date, "rows": rows, "totals": daily_report_totals(rows), "pages": daily_report_page_count(len(rows))}
 
+def build_range_report(first, last):
+    """Return (sections, summary) for every billed day between first and last (inclusive)."""
+    sections = [_build_report_section(date, rows) for date, rows in sorted(partition_bills_by_date(first, last).items())]
+
+    service_counter, staff_counter = Counter(), Counter()
+    summary = {"income": 0.0, "customers": 0, "days": len(sections)}
+    for sec in sections:
+        summary["income"] += sec["totals"]["income"]
+        summary["customers"] += sec["totals"]["customers"]
+        service_counter.update(sec["totals"]["service_counts"])
+        staff_counter.update(sec["totals"]["staff_counts"])
+    summary["top_service"] = service_counter.most_common(1)[0][0] if service_counter else "-"
+    summary["top_staff"] = staff_counter.most_common(1)[0][0] if staff_counter else "-"
+    return sections, summary
+
+RANGE_TOC_TOP = 150   # distance of the first contents line below the top margin
+
+def create_range_report_pdf(path, first, last, sections, summary):
+    if not REPORTLAB_AVAILABLE:
+        raise RuntimeError("reportlab not installed")
+    c = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    margin = 20*mm
+    x = margin
+    y = height - margin
+
+    toc_pages = _lines_page_count(len(sections), y - RANGE_TOC_TOP, y)
+    page = toc_pages + 1
+    start_pages = []
+    for sec in sections:
+        start_pages.append(page)
+        page += sec["pages"]
+
+    # summary and table of contents
+    c.bookmarkPage("summary")
+    c.addOutlineEntry("Summary", "summary", level=0)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(x, y - 10, f"BellaDesk Report - {first} to {last}")
+    c.setFont("Helvetica", 10)
+    y_line = y - 40
+    c.drawString(x, y_line, f"Total Income: Rs {summary['income']:.2f}")
+    c.drawString(x+250, y_line, f"Total Customers: {summary['customers']}")
+    y_line -= 14
+    c.drawString(x, y_line, f"Days with sales: {summary['days']}")
+    if summary["days"]:
+        c.drawString(x+250, y_line, f"Average per day: Rs {summary['income'] / summary['days']:.2f}")
+    y_line -= 20
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(x, y_line, "Top Service")
+    c.drawString(x+150, y_line, "Top Staff")
+    y_line -= 14
+    c.setFont("Helvetica", 10)
+    c.drawString(x, y_line, summary["top_service"])
+    c.drawString(x+150, y_line, summary["top_staff"])
+    y_line -= 36
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(x, y_line, "Date")
+    c.drawString(x+120, y_line, "Customers")
+    c.drawString(x+220, y_line, "Income")
+    c.drawString(x+420, y_line, "Page")
+    y_line = y - RANGE_TOC_TOP
+    c.setFont("Helvetica", 9)
+    for sec, start in zip(sections, start_pages):
+        if y_line < REPORT_BOTTOM:
+            c.showPage()
+            c.setFont("Helvetica", 9)
+            y_line = y
+        c.drawString(x, y_line, sec["date"])
+        c.drawString(x+120, y_line, str(sec["totals"]["customers"]))
+        c.drawString(x+220, y_line, f"{sec['totals']['income']:.2f}")
+        c.drawString(x+420, y_line, str(start))
+        c.linkRect("", "day_" + sec["date"], (x, y_line - 2, x + 450, y_line + 9), relative=1)
+        y_line -= REPORT_ROW_STEP
     c.showPage()
+
+    # one section per day
+    for sec in sections:
+        c.bookmarkPage("day_" + sec["date"])
+        c.addOutlineEntry(sec["date"], "day_" + sec["date"], level=0)
+        _draw_daily_report(c, sec["date"], sec["rows"], sec["totals"])
     c.save()
 
 def bill_exists(appointment_id):
-    if not os.path.exists(BILL_FILE):
-        return False
-    with open(BILL_FILE, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if str(row.get("ID")) == str(appointment_id):
-                return True
-    return False
+    return bool(billed_ids([appointment_id]))
+
+# ----------------- Branches -----------------
+# Head-office mode: BRANCHES_FILE lists branch data folders, each laid out
+# like this one (staff.csv, appointments.csv, bills.csv, archive/). Every
+# branch is reduced in its own worker process to a partial aggregate of
+# per-day totals; merge_branch_aggregates() adds the partials up for any
+# branch selection and date range without touching the files again.
+def load_branch_list():
+    try:
+        with open(BRANCHES_FILE, encoding="utf-8") as f:
+            branches = json.load(f).get("branches", [])
+    except (OSError, ValueError):
+        branches = []
+    return branches or [{"name": "This branch", "dir": "."}]
+
+def save_branch_list(branches):
+    with open(BRANCHES_FILE, "w", encoding="utf-8") as f:
+        json.dump({"branches": branches}, f, indent=1)
+
+def _branch_ledger(root, kind, hot_file):
+    archive = os.path.join(root, ARCHIVE_DIR)
+    paths = [os.path.join(archive, f"{kind}_{m}.csv.gz") for m in archived_months(kind, archive)]
+    if os.path.exists(os.path.join(root, hot_file)):
+        paths.append(os.path.join(root, hot_file))
+    return paths
+
+def load_branch_aggregate(branch):
+    """Per-day totals for one branch folder: {"branch", "staff", "days": {date: {...}}}."""
+    root = branch["dir"]
+    days = {}
+    def day(date):
+        d = days.get(date)
+        if d is None:
+            d = days[date] = {"revenue": 0.0, "bills": 0, "appointments": 0, "services": {}, "staff": {}}
+        return d
+    with gc_paused():
+        for path in _branch_ledger(root, "bills", BILL_FILE):
+            for date, staff, services, final in scan_csv(path, ["Date", "Staff", "Services", "Final"], {"Final": float}):
+                if not date or final is None:
+                    continue
+                d = day(date)
+                d["revenue"] += final
+                d["bills"] += 1
+                d["staff"][staff] = d["staff"].get(staff, 0.0) + final
+                for s in services.split(";"):
+                    s = s.strip()
+                    if s:
+                        d["services"][s] = d["services"].get(s, 0) + 1
+        for path in _branch_ledger(root, "appointments", APPT_FILE):
+            for date, in scan_csv(path, ["Date"]):
+                if date:
+                    day(date)["appointments"] += 1
+    staff_path = os.path.join(root, STAFF_FILE)
+    staff = sum(1 for _ in scan_csv(staff_path, ["Name"])) if os.path.exists(staff_path) else 0
+    return {"branch": branch["name"], "staff": staff, "days": days}
+
+def _load_branch_checked(branch):
+    """load_branch_aggregate(), with a failure returned as {"branch", "error"} instead of raised."""
+    try:
+        return load_branch_aggregate(branch)
+    except Exception as e:
+        return {"branch": branch.get("name", "?"), "error": f"{type(e).__name__}: {e}"}
+
+def load_branches(branches, workers=None):
+    """Load every branch in parallel worker processes; returns (aggregates, [(branch, error)]).
+
+    Workers are spawned rather than forked, since this runs on a thread of the Tk process.
+    """
+    results = None
+    if len(branches) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = list(pool.map(_load_branch_checked, branches))
+        except (OSError, BrokenProcessPool):
+            results = None   # no worker processes available, load in-process
+    if results is None:
+        results = [_load_branch_checked(b) for b in branches]
+    return [r for r in results if "error" not in r], [(r["branch"], r["error"]) for r in results if "error" in r]
+
+def merge_branch_aggregates(aggregates, branch=None, first="", last="9999-12-31"):
+    """Combine branch aggregates for one branch (None = all) over first..last (inclusive).
+
+    Returns {"total": totals, "branches": {name: totals}, "months": {YYYY-MM: revenue}}; totals hold
+    revenue, bills, appointments, staff, and services / staff_revenue Counters.
+    """
+    def empty():
+        return {"revenue": 0.0, "bills": 0, "appointments": 0, "staff": 0,
+                "services": Counter(), "staff_revenue": Counter()}
+    total, per_branch, months = empty(), {}, {}
+    for agg in aggregates:
+        if branch is not None and agg["branch"] != branch:
+            continue
+        b = per_branch[agg["branch"]] = empty()
+        b["staff"] = agg["staff"]
+        for date, d in agg["days"].items():
+            if not (first <= date <= last):
+                continue
+            b["revenue"] += d["revenue"]
+            b["bills"] += d["bills"]
+            b["appointments"] += d["appointments"]
+            b["services"].update(d["services"])
+            b["staff_revenue"].update(d["staff"])
+            months[date[:7]] = months.get(date[:7], 0.0) + d["revenue"]
+        for key in ("revenue", "bills", "appointments", "staff"):
+            total[key] += b[key]
+        total["services"].update(b["services"])
+        total["staff_revenue"].update({(agg["branch"], k): v for k, v in b["staff_revenue"].items()})
+    return {"total": total, "branches": per_branch, "months": dict(sorted(months.items()))}
+
+# ----------------- Sync -----------------
+# With sync enabled, every local edit to staff, appointments, recurring series or
+# bills becomes a change
+#   {"origin", "seq", "clock", "kind", "key", "op": "put" | "delete", "data"}
+# appended to SYNC_DIR/<origin>.log, where origin is this terminal's id and seq
+# counts its changes from 1. SYNC_DIR/<origin>.idx holds each change's byte
+# offset, so "changes after seq n" is a single seek. Changes received from
+# other terminals are kept the same way under their own origin, so they can
+# be relayed. A vector {origin: last seq held} says what a terminal has; a sync
+# sends only what the other side's vector lacks. When two terminals edit the
+# same record, the change with the higher (Lamport clock, origin) wins
+# everywhere, whatever order the changes arrive in. The winning version of each
+# record and the clock are derived from the logs: SYNC_DIR/versions.snap is a
+# checkpoint of them, and only changes logged after it are replayed, so a
+# change costs one log append however many records have been synced.
+_OFFSET = struct.Struct("<Q")
+_ORIGIN_ID = re.compile(r"[0-9a-f]{32}")
+_sync_lock = threading.RLock()
+_sync_state = None
+_sync_index = None         # {"vector", "clock", "versions", "pending"} derived from the logs
+_sync_seen = None          # last synced copy of staff / appointments, to diff bulk reloads
+_sync_applying = [False]
+
+def sync_applying():
+    """True while changes from another terminal are being applied."""
+    return _sync_applying[0]
+
+def _sync_state_path():
+    return os.path.join(SYNC_DIR, "state.json")
+
+def sync_state():
+    """This terminal's {"origin", "terminal", "peer"}, or None if sync is off."""
+    global _sync_state
+    if _sync_state is None and os.path.exists(_sync_state_path()):
+        with open(_sync_state_path(), encoding="utf-8") as f:
+            _sync_state = json.load(f)
+        for derived in ("clock", "versions"):   # kept here by older versions; now read from the logs
+            _sync_state.pop(derived, None)
+    return _sync_state
+
+def _save_sync_state():
+    tmp = _sync_state_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_sync_state, f)
+    os.replace(tmp, _sync_state_path())
+
+def terminal_id(candidate):
+    """The smallest id >= candidate this terminal may hand out. With sync on, ids are kept
+    congruent to the terminal number modulo SYNC_ID_STRIDE so two terminals never clash."""
+    state = sync_state()
+    if state:
+        candidate += (state["terminal"] - candidate) % SYNC_ID_STRIDE
+    return candidate
+
+def take_appointment_id():
+    """Allocate the next appointment id."""
+    global Next_id
+    new_id = terminal_id(Next_id)
+    Next_id = new_id + 1
+    return new_id
+
+def _log_paths(origin):
+    return os.path.join(SYNC_DIR, origin + ".log"), os.path.join(SYNC_DIR, origin + ".idx")
+
+def sync_vector():
+    """{origin: number of its changes held here}."""
+    if not os.path.isdir(SYNC_DIR):
+        return {}
+    return {n[:-len(".idx")]: os.path.getsize(os.path.join(SYNC_DIR, n)) // _OFFSET.size
+            for n in os.listdir(SYNC_DIR) if n.endswith(".idx")}
+
+def _append_changes(origin, changes):
+    log_path, idx_path = _log_paths(origin)
+    with open(log_path, "ab") as log:
+        offset = os.fstat(log.fileno()).st_size
+        offsets = []
+        for change in changes:
+            line = (json.dumps(change, separators=(",", ":")) + "\n").encode("utf-8")
+            log.write(line)
+            offsets.append(offset)
+            offset += len(line)
+    # the index is written last: a change only counts once its offset is there
+    with open(idx_path, "ab") as idx:
+        idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+
+def changes_since(vector):
+    """Changes held here beyond the given vector, in seq order per origin."""
+    out = []
+    for origin, have in sync_vector().items():
+        after = vector.get(origin, 0)
+        if have <= after:
+            continue
+        log_path, idx_path = _log_paths(origin)
+        with open(idx_path, "rb") as idx:
+            idx.seek(after * _OFFSET.size)
+            start, = _OFFSET.unpack(idx.read(_OFFSET.size))
+        with open(log_path, "rb") as log:
+            log.seek(start)
+            lines = log.read().splitlines()[:have - after]
+        out.extend(json.loads(line) for line in lines)
+    return out
+
+def _note_change(index, change):
+    """Fold one logged change into the derived vector, clock and record versions."""
+    origin = change["origin"]
+    index["vector"][origin] = max(index["vector"].get(origin, 0), change["seq"])
+    index["clock"] = max(index["clock"], change["clock"])
+    key = f"{change['kind']}:{change['key']}"
+    version = [change["clock"], origin]
+    current = index["versions"].get(key)
+    if current is None or current < version:
+        index["versions"][key] = version
+    index["pending"] += 1
+
+def _write_sync_checkpoint(index):
+    path = os.path.join(SYNC_DIR, "versions.snap")
+    index["pending"] = 0
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(index, f, protocol=5)
+    os.replace(path + ".tmp", path)
+
+def _sync_versions():
+    """The derived {"vector", "clock", "versions"}: the checkpoint plus the changes logged after it."""
+    global _sync_index
+    with _sync_lock:
+        if _sync_index is None:
+            try:
+                with open(os.path.join(SYNC_DIR, "versions.snap"), "rb") as f:
+                    index = pickle.load(f)
+            except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+                index = {"vector": {}, "clock": 0, "versions": {}, "pending": 0}
+            for change in changes_since(index["vector"]):
+                _note_change(index, change)
+            _sync_index = index
+        return _sync_index
+
+def _logged(index, changes):
+    """Note changes just appended to the logs; checkpoint once enough have piled up."""
+    for change in changes:
+        _note_change(index, change)
+    if index["pending"] >= SYNC_CHECKPOINT_CHANGES:
+        _write_sync_checkpoint(index)
+
+def _appointment_data(a):
+    return {"id": a["id"], "name": a["name"], "services": list(a["services"]), "date": a["date"], "time": a["time"], "staff": a["staff"]}
+
+def _series_data():
+    return {str(r["id"]): dict(r) for r in load_recurring()}
+
+def _staff_data():
+    return {n: {"name": n, "spec": sp, "salary": sal} for n, sp, sal in zip(staffNames, staffSpecs, staffSalaries)}
+
+def _record(changes):
+    """Log local (kind, key, op, data) edits as this terminal's next changes."""
+    state = sync_state()
+    if state is None or _sync_seen is None or sync_applying() or not changes:
+        return
+    with _sync_lock:
+        index = _sync_versions()
+        origin = state["origin"]
+        seq, clock = index["vector"].get(origin, 0), index["clock"]
+        batch = []
+        for kind, key, op, data in changes:
+            clock += 1
+            seq += 1
+            batch.append({"origin": origin, "seq": seq, "clock": clock, "kind": kind,
+                          "key": str(key), "op": op, "data": data})
+        _append_changes(origin, batch)
+        _logged(index, batch)
+
+def _on_appointment_put(appt):
+    if _sync_seen is not None:
+        _sync_seen["appointment"][str(appt["id"])] = _appointment_data(appt)
+    _record([("appointment", appt["id"], "put", _appointment_data(appt))])
+
+def _on_appointment_removed(appt):
+    if _sync_seen is not None:
+        _sync_seen["appointment"].pop(str(appt["id"]), None)
+    _record([("appointment", appt["id"], "delete", None)])
+
+def _on_appointments_reloaded():
+    # bulk edits (import, archive) only say "reloaded": diff against the last known copy
+    if _sync_seen is None or sync_applying():
+        return
+    seen = _sync_seen["appointment"]
+    current = {str(a["id"]): _appointment_data(a) for a in Appointments}
+    archived = set(archived_months("appointments"))
+    changes = [("appointment", k, "put", v) for k, v in current.items() if seen.get(k) != v]
+    changes += [("appointment", k, "delete", None) for k, v in seen.items()
+                if k not in current and v["date"][:7] not in archived]   # archived rows are not deletions
+    _sync_seen["appointment"] = current
+    _record(changes)
+
+def _on_staff_changed():
+    if _sync_seen is None or sync_applying():
+        return
+    seen, current = _sync_seen["staff"], _staff_data()
+    changes = [("staff", n, "put", v) for n, v in current.items() if seen.get(n) != v]
+    changes += [("staff", n, "delete", None) for n in seen if n not in current]
+    _sync_seen["staff"] = current
+    _record(changes)
+
+def _on_recurring_changed():
+    if _sync_seen is None or sync_applying():
+        return
+    seen, current = _sync_seen["series"], _series_data()
+    changes = [("series", k, "put", v) for k, v in current.items() if seen.get(k) != v]
+    changes += [("series", k, "delete", None) for k in seen if k not in current]
+    _sync_seen["series"] = current
+    _record(changes)
+
+def _on_bills_saved(rows):
+    _record([("bill", row["ID"], "put", [row.get(h, "") for h in BILL_HEADERS]) for row in rows])
+
+subscribe("appointment_added", _on_appointment_put)
+subscribe("appointment_updated", _on_appointment_put)
+subscribe("appointment_removed", _on_appointment_removed)
+subscribe("appointments_reloaded", _on_appointments_reloaded)
+subscribe("staff_changed", _on_staff_changed)
+subscribe("recurring_changed", _on_recurring_changed)
+subscribe("bills_saved", _on_bills_saved)
+
+def track_sync_changes():
+    """Start logging local edits (call after staff and appointments are loaded)."""
+    global _sync_seen
+    if sync_state() is not None:
+        _sync_seen = {"staff": _staff_data(), "series": _series_data(),
+                      "appointment": {str(a["id"]): _appointment_data(a) for a in Appointments}}
+        # series were not synced by older versions: log any this terminal has never sent or received
+        versions = _sync_versions()["versions"]
+        _record([("series", k, "put", v) for k, v in _sync_seen["series"].items() if f"series:{k}" not in versions])
+
+def enable_sync(terminal):
+    """Turn sync on for this data folder and log the current data as this terminal's first changes."""
+    global _sync_state
+    if not 1 <= terminal < SYNC_ID_STRIDE:
+        raise ValueError(f"terminal must be between 1 and {SYNC_ID_STRIDE - 1}")
+    if sync_state() is not None:
+        raise RuntimeError("sync is already enabled here")
+    os.makedirs(SYNC_DIR, exist_ok=True)
+    _sync_state = {"origin": uuid.uuid4().hex, "terminal": terminal}
+    track_sync_changes()
+    changes = [("staff", n, "put", v) for n, v in _sync_seen["staff"].items()]
+    changes += [("appointment", k, "put", v) for k, v in _sync_seen["appointment"].items()]
+    changes += [("bill", row["ID"], "put", [row[h] for h in BILL_HEADERS]) for row in iter_bill_rows()]
+    _record(changes)
+    _save_sync_state()   # also when there was nothing to log yet
+
+def _apply_change(change, touched):
+    """Collect one winning change; appointments and series are written per batch afterwards."""
+    kind, key, data = change["kind"], change["key"], change["data"]
+    if kind in ("appointment", "series"):
+        touched.setdefault(kind, {})[key] = None if change["op"] == "delete" else data
+    elif kind == "staff":
+        i = staffNames.index(key) if key in staffNames else None
+        if change["op"] == "delete":
+            if i is not None:
+                del staffNames[i], staffSpecs[i], staffSalaries[i]
+        elif i is not None:
+            staffNames[i], staffSpecs[i], staffSalaries[i] = data["name"], data["spec"], data["salary"]
+        else:
+            staffNames.append(data["name"]); staffSpecs.append(data["spec"]); staffSalaries.append(data["salary"])
+        touched["staff"] = True
+    elif kind == "bill":
+        touched.setdefault("bills", []).append(data)
+
+def _apply_appointments(changes):
+    """Apply {id: appointment data, or None to delete} to Appointments, then publish the events.
+
+    Appointments is indexed by id once; unmoved ones are replaced in place and the
+    rest are merged back in (date, time) order, so the list is walked once per batch.
+    """
+    position = {str(a["id"]): i for i, a in enumerate(Appointments)}
+    dropped, inserted, events = set(), [], []
+    for key, data in changes.items():
+        i = position.get(key)
+        if data is None:
+            if i is not None:
+                dropped.add(i)
+                events.append(("appointment_removed", Appointments[i]))
+            _sync_seen["appointment"].pop(key, None)
+            continue
+        appt = dict(data, id=int(data["id"]))
+        if i is not None and (Appointments[i]["date"], Appointments[i]["time"]) == (appt["date"], appt["time"]):
+            Appointments[i] = appt
+        else:
+            if i is not None:
+                dropped.add(i)
+            inserted.append(appt)
+        events.append(("appointment_updated" if i is not None else "appointment_added", appt))
+        _sync_seen["appointment"][key] = _appointment_data(appt)
+    if dropped or inserted:
+        kept = [a for i, a in enumerate(Appointments) if i not in dropped] if dropped else list(Appointments)
+        by_start = lambda a: (a["date"], a["time"])
+        Appointments[:] = heapq.merge(kept, sorted(inserted, key=by_start), key=by_start)
+    for event, appt in events:
+        publish(event, appt)
+
+def _apply_series(changes):
+    """Apply {series id: rule, or None to delete} to RECURRING_FILE."""
+    series = _series_data()
+    for key, rule in changes.items():
+        if rule is None:
+            series.pop(key, None)
+        else:
+            series[key] = rule
+    save_recurring(sorted(series.values(), key=lambda r: r["id"]))
+    _sync_seen["series"] = _series_data()
+
+def apply_remote_changes(changes):
+    """Apply changes from another terminal; returns how many were new here."""
+    global Next_id
+    state = sync_state()
+    if state is None or _sync_seen is None:
+        raise RuntimeError("sync is not enabled here")
+    with _sync_lock:
+        index = _sync_versions()
+        have = index["vector"]
+        fresh = {}
+        for c in changes:
+            origin = c.get("origin", "")
+            if not _ORIGIN_ID.fullmatch(origin) or origin == state["origin"]:
+                continue
+            batch = fresh.setdefault(origin, [])
+            if c.get("seq") == have.get(origin, 0) + len(batch) + 1:   # anything else was seen already or arrives later
+                batch.append(c)
+        touched = {}
+        _sync_applying[0] = True
+        try:
+            for origin, batch in fresh.items():
+                _append_changes(origin, batch)
+            for c in sorted((c for batch in fresh.values() for c in batch), key=lambda c: (c["clock"], c["origin"])):
+                current = index["versions"].get(f"{c['kind']}:{c['key']}")
+                _logged(index, [c])
+                if current is not None and current >= [c["clock"], c["origin"]]:
+                    continue   # a newer edit of this record is already here
+                if c["kind"] == "bill" and current is not None:
+                    continue   # bills are append-only: the ledger already has this one
+                _apply_change(c, touched)
+            if "series" in touched:
+                _apply_series(touched["series"])
+            if "appointment" in touched:
+                _apply_appointments(touched["appointment"])
+                Next_id = max([Next_id] + [a["id"] + 1 for a in Appointments])
+                save_appointments()
+            if "staff" in touched:
+                save_staff()
+                _sync_seen["staff"] = _staff_data()
+                publish("staff_changed")
+            if touched.get("bills"):
+                append_bill_rows(touched["bills"])
+        finally:
+            _sync_applying[0] = False
+    return sum(len(batch) for batch in fresh.values())
+
+class _SyncHandler(BaseHTTPRequestHandler):
+    # GET /vector, POST /pull {"vector"} -> {"changes"}, POST /push {"changes"} -> {"accepted"}
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/vector":
+            self._reply(sync_vector())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self.send_error(400)
+            return
+        if self.path == "/pull":
+            self._reply({"changes": changes_since(body.get("vector", {}))})
+        elif self.path == "/push":
+            self._reply({"accepted": self.server.apply(body.get("changes", []))})
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+def start_sync_server(port=SYNC_PORT, host="127.0.0.1", apply=apply_remote_changes):
+    """Serve sync requests on a background thread; apply receives pushed changes."""
+    server = ThreadingHTTPServer((host, port), _SyncHandler)
+    server.apply = apply
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _http_json(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+def sync_with(url):
+    """Exchange changes with the terminal serving at url; returns (sent, received)."""
+    url = url.rstrip("/")
+    outgoing = changes_since(_http_json(url + "/vector"))
+    if outgoing:
+        _http_json(url + "/push", {"changes": outgoing})
+    incoming = _http_json(url + "/pull", {"vector": sync_vector()})["changes"]
+    return len(outgoing), apply_remote_changes(incoming)
 
 # ----------------- Main GUI App -----------------
 class BellaDeskApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, sync_host="127.0.0.1", sync_port=SYNC_PORT):
         super().__init__()
         self.title("BellaDesk Management System")
         w = self.winfo_screenwidth()
@@ -309,14 +2958,59 @@ class BellaDeskApp(tk.Tk):
         self.geometry(f"{w}x{h}")
         self.configure(bg="#f6f7f9")
 
+        archive_closed_months()
         load_staff()
         load_appointments()
+        reminders.rebuild(catch_up=True)
+        track_sync_changes()
+        self.sync_inbox = queue.Queue()
+        self.sync_server = None
+        if sync_state() is not None:
+            try:
+                # pushed changes are applied on the Tk thread by drain_sync_inbox
+                self.sync_server = start_sync_server(sync_port, sync_host, apply=self.queue_remote_changes)
+            except OSError:
+                pass   # port taken, e.g. a second window: this one can still sync out
 
         self.create_header()
         self.create_sidebar()
         self.create_frames()
         self.active_frame = None
         self.show_dashboard()
+        self.tick_reminders()
+        self.drain_sync_inbox()
+
+    def queue_remote_changes(self, changes):
+        self.sync_inbox.put(changes)
+        return len(changes)
+
+    def drain_sync_inbox(self):
+        while not self.sync_inbox.empty():
+            apply_remote_changes(self.sync_inbox.get())
+        self.after(500, self.drain_sync_inbox)
+
+    def sync_now(self):
+        state = sync_state()
+        if state is None:
+            messagebox.showinfo("Sync", "Sync is off. Enable it once with:  python BDUI.py --enable-sync <terminal 1-99>")
+            return
+        url = simpledialog.askstring("Sync", "Other terminal (http://host:port):", parent=self,
+                                     initialvalue=state.get("peer", f"http://127.0.0.1:{SYNC_PORT}"))
+        if not url:
+            return
+        try:
+            sent, received = sync_with(url)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Sync", f"Could not sync with {url}:\n{e}")
+            return
+        state["peer"] = url
+        _save_sync_state()
+        messagebox.showinfo("Sync", f"Sent {sent} change(s), received {received}.")
+
+    def tick_reminders(self):
+        reminders.roll()
+        reminders.fire_due()
+        self.after(REMINDER_TICK_MS, self.tick_reminders)
 
     def create_header(self):
         header = tk.Frame(self, bg="#2f3640", height=68)
@@ -342,6 +3036,11 @@ class BellaDeskApp(tk.Tk):
             ("Staff", self.show_staff),
             ("Billing", self.show_billing),
             ("Daily Report", self.show_daily_report),
+            ("Staff Analytics", self.show_staff_analytics),
+            ("Occupancy", self.show_occupancy),
+            ("Walk-in Queue", self.show_walkins),
+            ("Head Office", self.show_head_office),
+            ("Sync Now", self.sync_now),
             ("Exit", self.quit)
         ]
         for (txt, cmd) in buttons:
@@ -356,6 +3055,10 @@ class BellaDeskApp(tk.Tk):
         self.staff_frame = StaffFrame(self.container, self)
         self.billing_frame = BillingFrame(self.container, self)
         self.daily_report_frame = DailyReportFrame(self.container, self)
+        self.staff_analytics_frame = StaffAnalyticsFrame(self.container, self)
+        self.occupancy_frame = OccupancyFrame(self.container, self)
+        self.walkin_frame = WalkInFrame(self.container, self)
+        self.head_office_frame = HeadOfficeFrame(self.container, self)
 
     def switch_frame(self, frame):
         if self.active_frame:
@@ -373,6 +3076,18 @@ class BellaDeskApp(tk.Tk):
         self.switch_frame(self.billing_frame)
     def show_daily_report(self):
         self.switch_frame(self.daily_report_frame)
+    def show_staff_analytics(self):
+        self.staff_analytics_frame.refresh()
+        self.switch_frame(self.staff_analytics_frame)
+    def show_occupancy(self):
+        self.occupancy_frame.refresh()
+        self.switch_frame(self.occupancy_frame)
+    def show_walkins(self):
+        self.switch_frame(self.walkin_frame)
+    def show_head_office(self):
+        if self.head_office_frame.aggregates is None:
+            self.head_office_frame.reload()
+        self.switch_frame(self.head_office_frame)
 
 # ----------------- Frames -----------------
 class DashboardFrame(tk.Frame):
@@ -391,27 +3106,32 @@ class DashboardFrame(tk.Frame):
             fg="#2f3640"
         ).pack(pady=20)
 
+        # running aggregates, kept current by the event handlers below
+        self.income = 0.0
+        self.service_count = Counter()
+        self.monthly = {}
+        self.scan_bills()
+        self.today = datetime.date.today().strftime("%Y-%m-%d")
+        self.today_count = self.today_appointments()
+
         # -------------------------
         # KPI CARDS (Top Stats)
         # -------------------------
         kpi_frame = tk.Frame(self, bg="white")
         kpi_frame.pack(pady=10)
 
-        total_appt = len(Appointments)
-        total_staff = len(staffNames)
-        total_income = self.calculate_total_income()
-
-        today_count = self.today_appointments()
-
+        self.kpi_vars = {}
         cards = [
-            ("Total Appointments", total_appt, "#0984e3"),
-            ("Total Staff", total_staff, "#6c5ce7"),
-            ("Revenue Collected", f"Rs. {total_income}", "#00b894"),
-            ("Today's Bookings", today_count, "#d63031"),
+            ("Total Appointments", "#0984e3"),
+            ("Total Staff", "#6c5ce7"),
+            ("Revenue Collected", "#00b894"),
+            ("Today's Bookings", "#d63031"),
         ]
 
-        for title, value, color in cards:
-            self.create_kpi_card(kpi_frame, title, value, color)
+        for title, color in cards:
+            self.kpi_vars[title] = tk.StringVar()
+            self.create_kpi_card(kpi_frame, title, self.kpi_vars[title], color)
+        self.update_kpis()
 
         # -------------------------
         # CHARTS
@@ -425,6 +3145,20 @@ class DashboardFrame(tk.Frame):
         # Right Chart → Monthly Revenue Trend
         self.monthly_revenue_chart(chart_frame)
 
+        # -------------------------
+        # LIVE UPDATES
+        # -------------------------
+        self._redraw_job = None
+        self._dirty = set()
+        subscribe("bill_saved", self.on_bill_saved)
+        subscribe("appointment_added", self.on_appointment_added)
+        subscribe("appointment_removed", self.on_appointment_removed)
+        subscribe("appointment_updated", self.on_appointments_changed)
+        subscribe("appointments_reloaded", self.on_appointments_changed)
+        subscribe("recurring_changed", self.on_appointments_changed)
+        subscribe("staff_changed", self.on_staff_changed)
+        subscribe("ledger_archived", self.on_ledger_archived)
+
     # -------------------------
     # HELPERS
     # -------------------------
@@ -437,98 +3171,182 @@ class DashboardFrame(tk.Frame):
         else:
             return "Good Evening"
 
-    def calculate_total_income(self):
-        total = 0
+    def scan_bills(self):
+        # archived months are read from their summaries, then one pass over
+        # the hot ledger fills in the rest
+        self.archived_appts = sum(segment_summary("appointments", m)["rows"] for m in archived_months("appointments"))
+        for month in archived_months("bills"):
+            summary = segment_summary("bills", month)
+            self.service_count.update(summary["service_counts"])
+            self.income += summary["revenue"]
+            self.monthly[month] = self.monthly.get(month, 0) + summary["revenue"]
         if not os.path.exists(BILL_FILE):
-            return 0
-        with open(BILL_FILE, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for r in reader:
-                try:
-                    total += float(r.get("Final", 0))
-                except:
-                    pass
-        return int(total)
+            return
+        for services, final, date in scan_csv(BILL_FILE, ["Services", "Final", "Date"], {"Final": float}):
+            self.add_bill_values(services, final, date)
+
+    def add_bill(self, row):
+        try:
+            final = float(row.get("Final", 0))
+        except:
+            final = None
+        self.add_bill_values(row.get("Services", ""), final, row.get("Date", ""))
+
+    def add_bill_values(self, services, final, date):
+        for s in services.split(";"):
+            self.service_count[s.strip()] += 1
+        if final is None:
+            return
+        self.income += final
+        if date:
+            month = date[:7]   # YYYY-MM
+            self.monthly[month] = self.monthly.get(month, 0) + final
 
     def today_appointments(self):
         today = datetime.date.today().strftime("%Y-%m-%d")
-        return sum(1 for a in Appointments if a["date"] == today)
+        return len(appointments_between(today, today))
+
+    def update_kpis(self):
+        self.kpi_vars["Total Appointments"].set(len(Appointments) + self.archived_appts)
+        self.kpi_vars["Total Staff"].set(len(staffNames))
+        self.kpi_vars["Revenue Collected"].set(f"Rs. {int(self.income)}")
+        self.kpi_vars["Today's Bookings"].set(self.today_count)
 
     # KPI card box
-    def create_kpi_card(self, parent, title, value, color):
+    def create_kpi_card(self, parent, title, variable, color):
         frame = tk.Frame(parent, bg=color, width=200, height=100)
         frame.pack(side="left", padx=15)
 
         tk.Label(frame, text=title, bg=color, fg="white",
                  font=("Arial", 12, "bold")).pack(pady=8)
-        tk.Label(frame, text=value, bg=color, fg="white",
+        tk.Label(frame, textvariable=variable, bg=color, fg="white",
                  font=("Arial", 18, "bold")).pack()
 
+    # -------------------------
+    # EVENT HANDLERS
+    # -------------------------
+    def on_bill_saved(self, row):
+        self.add_bill(row)
+        self.schedule_redraw("services", "revenue")
+
+    def on_appointment_added(self, appt):
+        if appt["date"] == self.today:
+            self.today_count += 1
+        self.schedule_redraw()
+
+    def on_appointment_removed(self, appt):
+        if appt["date"] == self.today:
+            self.today_count -= 1
+        self.schedule_redraw()
+
+    def on_appointments_changed(self, *args):
+        self.today_count = self.today_appointments()
+        self.schedule_redraw()
+
+    def on_staff_changed(self):
+        self.schedule_redraw()
+
+    def on_ledger_archived(self):
+        self.income = 0.0
+        self.service_count = Counter()
+        self.monthly = {}
+        self.scan_bills()
+        self.schedule_redraw("services", "revenue")
+
+    def schedule_redraw(self, *charts):
+        # coalesce bursts of events into a single repaint
+        self._dirty.update(charts)
+        if self._redraw_job is None:
+            self._redraw_job = self.after(DASHBOARD_REDRAW_MS, self.redraw)
+
+    def redraw(self):
+        self._redraw_job = None
+        today = datetime.date.today().strftime("%Y-%m-%d")
+        if today != self.today:
+            self.today = today
+            self.today_count = self.today_appointments()
+        self.update_kpis()
+        if "services" in self._dirty:
+            self.draw_service_chart()
+            self.service_canvas.draw_idle()
+        if "revenue" in self._dirty:
+            self.draw_revenue_chart()
+            self.revenue_canvas.draw_idle()
+        self._dirty.clear()
+
     # -------------------------
     # CHART 1: Service Popularity
     # -------------------------
     def service_popularity_chart(self, parent):
-        service_count = Counter()
+        fig = Figure(figsize=(7.5, 6.5), dpi=90)
+        self.service_ax = fig.add_subplot(111)
+        self.service_names = None
+        self.service_bars = []
+        self.draw_service_chart()
 
-        if os.path.exists(BILL_FILE):
-            with open(BILL_FILE, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    for s in row.get("Services", "").split(";"):
-                        service_count[s.strip()] += 1
+        self.service_canvas = FigureCanvasTkAgg(fig, master=parent)
+        self.service_canvas.get_tk_widget().pack(side="left", padx=20)
 
-        fig = Figure(figsize=(7.5, 6.5), dpi=90)
-        ax = fig.add_subplot(111)
-
-        if service_count:
-            services = list(service_count.keys())
-            values = list(service_count.values())
-            ax.bar(services, values)
-            ax.set_title("Service Popularity")
-            ax.set_ylabel("Total Bookings")
-            ax.set_xticks(range(len(services)))
-            ax.set_xticklabels(services, rotation=25)
-        else:
-            ax.text(0.3, 0.5, "No data", fontsize=14)
+    def draw_service_chart(self):
+        ax = self.service_ax
+        services = list(self.service_count.keys())
+        values = list(self.service_count.values())
 
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.get_tk_widget().pack(side="left", padx=20)
+        if services == self.service_names:
+            # same categories: only the bar heights move
+            for bar, value in zip(self.service_bars, values):
+                bar.set_height(value)
+        else:
+            ax.clear()
+            self.service_names = services
+            if services:
+                self.service_bars = ax.bar(range(len(services)), values)
+                ax.set_title("Service Popularity")
+                ax.set_ylabel("Total Bookings")
+                ax.set_xticks(range(len(services)))
+                ax.set_xticklabels(services, rotation=25)
+            else:
+                self.service_bars = []
+                ax.text(0.3, 0.5, "No data", fontsize=14)
+        if values:
+            ax.set_ylim(0, max(values) * 1.1)
 
     # -------------------------
     # CHART 2: Monthly Revenue Trend
     # -------------------------
     def monthly_revenue_chart(self, parent):
-        monthly = {}
-
-        if os.path.exists(BILL_FILE):
-            with open(BILL_FILE, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    date = row.get("Date", "")
-                    if not date:
-                        continue
-                    month = date[:7]   # YYYY-MM
-                    try:
-                        monthly[month] = monthly.get(month, 0) + float(row.get("Final", 0))
-                    except:
-                        pass
-
         fig = Figure(figsize=(7.5, 6.5), dpi=90)
-        ax = fig.add_subplot(111)
+        self.revenue_ax = fig.add_subplot(111)
+        self.revenue_months = None
+        self.revenue_line = None
+        self.draw_revenue_chart()
+
+        self.revenue_canvas = FigureCanvasTkAgg(fig, master=parent)
+        self.revenue_canvas.get_tk_widget().pack(side="right", padx=20)
 
-        if monthly:
-            months = list(monthly.keys())
-            revenue = list(monthly.values())
-            ax.plot(months, revenue, marker="o")
+    def draw_revenue_chart(self):
+        ax = self.revenue_ax
+        months = list(self.monthly.keys())
+        revenue = list(self.monthly.values())
+
+        if not months:
+            ax.clear()
+            self.revenue_line = None
+            ax.text(0.3, 0.5, "No data", fontsize=14)
+            return
+        if self.revenue_line is None:
+            ax.clear()
+            self.revenue_line, = ax.plot(range(len(months)), revenue, marker="o")
             ax.set_title("Monthly Revenue Trend")
             ax.set_ylabel("Revenue (Rupees)")
+        else:
+            self.revenue_line.set_data(range(len(months)), revenue)
+        if months != self.revenue_months:
+            self.revenue_months = months
             ax.set_xticks(range(len(months)))
             ax.set_xticklabels(months, rotation=25)
-        else:
-            ax.text(0.3, 0.5, "No data", fontsize=14)
-
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.get_tk_widget().pack(side="right", padx=20)
+        ax.relim()
+        ax.autoscale_view()
 
 class AppointmentFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -559,9 +3377,19 @@ class AppointmentFrame(tk.Frame):
         self.staff_cb['values'] = ["-- Auto --"] + staffNames
         self.staff_cb.current(0)
         self.staff_cb.pack(fill="x", padx=8, pady=4)
+        repeat_row = tk.Frame(left, bg="white")
+        repeat_row.pack(fill="x", padx=8, pady=4)
+        tk.Label(repeat_row, text="Repeat:", bg="white").pack(side="left")
+        self.repeat_var = tk.StringVar(value="Does not repeat")
+        ttk.Combobox(repeat_row, textvariable=self.repeat_var, state="readonly", width=14,
+                     values=["Does not repeat"] + list(RECURRING_FREQUENCIES)).pack(side="left", padx=4)
+        tk.Label(repeat_row, text="Until:", bg="white").pack(side="left")
+        self.until_var = tk.StringVar()
+        tk.Entry(repeat_row, textvariable=self.until_var, width=11).pack(side="left", padx=4)
         tk.Button(left, text="Suggest Slot", command=self.suggest_slot).pack(pady=6)
         tk.Button(left, text="Book", bg="#44bd32", fg="white", command=self.book_action).pack(pady=6)
         tk.Button(left, text="Enroll Staff", command=self.enroll_staff_dialog).pack(pady=6)
+        tk.Button(left, text="Bulk Import (CSV/JSON)", command=self.bulk_import).pack(pady=6)
 
         # right table
         right = tk.Frame(frame, bg="white")
@@ -580,6 +3408,7 @@ class AppointmentFrame(tk.Frame):
         tk.Button(ctl, text="View", command=self.view_appt).pack(side="left", padx=6)
         tk.Button(ctl, text="Reschedule", command=self.reschedule).pack(side="left", padx=6)
         tk.Button(ctl, text="Cancel", command=self.cancel).pack(side="left", padx=6)
+        tk.Button(ctl, text="Plan Day (Waiting List)", command=lambda: DayPlanDialog(self)).pack(side="left", padx=6)
         self.refresh()
 
     def get_selected_services(self):
@@ -608,6 +3437,7 @@ class AppointmentFrame(tk.Frame):
             sal = 0
         staffNames.append(name); staffSpecs.append(spec); staffSalaries.append(sal)
         save_staff()
+        publish("staff_changed")
         self.staff_cb['values'] = ["-- Auto --"] + staffNames
         messagebox.showinfo("Done", "Staff enrolled.")
 
@@ -621,7 +3451,6 @@ class AppointmentFrame(tk.Frame):
         Appointments.append(appt)
 
     def book_action(self):
-        global Next_id
         name = self.name_var.get().strip()
         if not name or not name.replace(" ", "").isalpha():
             messagebox.showerror("Invalid", "Enter valid name")
@@ -646,18 +3475,64 @@ class AppointmentFrame(tk.Frame):
         else:
             q = find_qualified_staff(services)
             staff_assigned = q[0] if q else "Not Assigned"
-        appt = {"id": Next_id, "name": name, "services": services, "date": date, "time": time, "staff": staff_assigned}
+        if self.repeat_var.get() in RECURRING_FREQUENCIES:
+            self.book_series(name, services, slot, staff_assigned)
+            return
+        appt = {"id": take_appointment_id(), "name": name, "services": services, "date": date, "time": time, "staff": staff_assigned}
         self.insert_sorted(appt)
-        Next_id += 1
         save_appointments()
+        publish("appointment_added", appt)
         self.refresh()
         messagebox.showinfo("Booked", f"Appointment booked for {name} at {date} {time} with {staff_assigned}")
         self.name_var.set(""); self.serv_listbox.selection_clear(0, "end"); self.sugg_var.set("(Select services -> Suggest Slot)")
 
+    def book_series(self, name, services, slot, staff):
+        until = self.until_var.get().strip()
+        try:
+            if until and datetime.datetime.strptime(until, "%Y-%m-%d").date() < slot.date():
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid", "Until must be a YYYY-MM-DD date on or after the first visit")
+            return
+        freq, interval = RECURRING_FREQUENCIES[self.repeat_var.get()]
+        add_series(name, services, slot, staff, freq, interval, until)
+        self.refresh()
+        messagebox.showinfo("Booked", f"{self.repeat_var.get()} appointment for {name} from {slot:%Y-%m-%d %H:%M} with {staff}")
+        self.name_var.set(""); self.serv_listbox.selection_clear(0, "end"); self.sugg_var.set("(Select services -> Suggest Slot)")
+        self.repeat_var.set("Does not repeat"); self.until_var.set("")
+
+    def bulk_import(self):
+        path = filedialog.askopenfilename(title="Import appointments", filetypes=[("CSV / JSON", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            rows = read_import_file(path)
+        except Exception as e:
+            messagebox.showerror("Import", f"Could not read file:\n{e}")
+            return
+        appts, errors = validate_appointment_rows(rows)
+        if errors:
+            win = tk.Toplevel(self)
+            win.title(f"Import errors ({len(errors)})")
+            text = tk.Text(win, width=90, height=25)
+            text.pack(fill="both", expand=True)
+            text.insert("end", "\n".join(f"Row {line}: {msg}" for line, msg in errors))
+            if not appts or not messagebox.askyesno("Import", f"{len(errors)} rows have errors.\nImport the other {len(appts)} rows?", parent=win):
+                return
+        if not appts:
+            messagebox.showinfo("Import", "No appointments found in file")
+            return
+        commit_appointments(appts)
+        self.refresh()
+        messagebox.showinfo("Import", f"Imported {len(appts)} appointments")
+
     def refresh(self):
         for r in self.tree.get_children():
             self.tree.delete(r)
-        for a in Appointments:
+        # recurring series are shown for the next RECURRING_VIEW_DAYS only
+        today = datetime.date.today()
+        upcoming = iter_occurrences(today.isoformat(), (today + datetime.timedelta(days=RECURRING_VIEW_DAYS)).isoformat())
+        for a in sorted(chain(Appointments, upcoming), key=lambda a: (a["date"], a["time"])):
             self.tree.insert("", "end", values=(a["id"], a["name"], ", ".join(a["services"]), a["date"], a["time"], a["staff"]))
     def view_appt(self):
         sel = self.tree.selection()
@@ -665,12 +3540,12 @@ class AppointmentFrame(tk.Frame):
             messagebox.showwarning("Select", "Select an appointment")
             return
         vals = self.tree.item(sel[0], "values")
-        aid = int(vals[0])
-        appt = next((x for x in Appointments if x["id"]==aid), None)
+        appt = find_appointment(vals[0])
         if not appt:
             messagebox.showerror("Not found", "Appointment not found")
             return
-        messagebox.showinfo("Details", f"ID:{appt['id']}\nName:{appt['name']}\nServices:{', '.join(appt['services'])}\nDate:{appt['date']} {appt['time']}\nStaff:{appt['staff']}")
+        repeats = "\n(part of a recurring series)" if "series" in appt else ""
+        messagebox.showinfo("Details", f"ID:{appt['id']}\nName:{appt['name']}\nServices:{', '.join(appt['services'])}\nDate:{appt['date']} {appt['time']}\nStaff:{appt['staff']}{repeats}")
 
     def reschedule(self):
         sel = self.tree.selection()
@@ -678,9 +3553,9 @@ class AppointmentFrame(tk.Frame):
             messagebox.showwarning("Select", "Select an appointment")
             return
         vals = self.tree.item(sel[0], "values")
-        aid = int(vals[0])
-        idx = next((i for i,a in enumerate(Appointments) if a["id"]==aid), None)
-        if idx is None:
+        occ = find_occurrence(vals[0])
+        idx = next((i for i,a in enumerate(Appointments) if str(a["id"])==str(vals[0])), None)
+        if idx is None and occ is None:
             messagebox.showerror("Error", "Not found")
             return
         new_date = simpledialog.askstring("New Date", "YYYY-MM-DD:", parent=self)
@@ -694,14 +3569,21 @@ class AppointmentFrame(tk.Frame):
         except Exception:
             messagebox.showerror("Format", "Invalid format")
             return
-        for ex in Appointments:
-            if ex["date"]==new_date and ex["time"]==new_time:
+        for ex in appointments_between(new_date, new_date):
+            if ex["time"]==new_time:
                 messagebox.showwarning("Collision", "Slot exists")
                 return
+        if occ is not None:
+            # only this occurrence moves; the rest of the series stays put
+            detach_occurrence(occ, datetime.datetime.strptime(new_date + " " + new_time, "%Y-%m-%d %H:%M"))
+            self.refresh()
+            messagebox.showinfo("Done", "Rescheduled")
+            return
         appt = Appointments.pop(idx)
         appt["date"] = new_date; appt["time"] = new_time
         self.insert_sorted(appt)
         save_appointments()
+        publish("appointment_updated", appt)
         self.refresh()
         messagebox.showinfo("Done", "Rescheduled")
 
@@ -711,16 +3593,156 @@ class AppointmentFrame(tk.Frame):
             messagebox.showwarning("Select", "Select an appointment")
             return
         vals = self.tree.item(sel[0], "values")
+        occ = find_occurrence(vals[0])
+        if occ is not None:
+            only_this = messagebox.askyesnocancel("Cancel", f"Cancel only the {occ['date']} visit?\n\n"
+                                                  "Yes: only this visit\nNo: this and all later visits")
+            if only_this is None:
+                return
+            if only_this:
+                skip_occurrence(occ)
+            else:
+                end_series_before(occ)
+            self.refresh()
+            messagebox.showinfo("Cancelled", "Appointment cancelled")
+            return
         aid = int(vals[0])
         if messagebox.askyesno("Confirm", f"Cancel ID {aid}?"):
             for a in list(Appointments):
                 if a["id"]==aid:
                     Appointments.remove(a)
                     save_appointments()
+                    publish("appointment_removed", a)
                     self.refresh()
                     messagebox.showinfo("Cancelled", "Appointment cancelled")
                     return
 
+class DayPlanDialog(tk.Toplevel):
+    """Collect a day's waiting list, preview the optimized plan and book it."""
+    def __init__(self, appointment_frame):
+        super().__init__(appointment_frame)
+        self.appointment_frame = appointment_frame
+        self.title("Plan Day")
+        self.geometry("980x560")
+        self.requests = []
+        self.plan = []
+
+        form = tk.Frame(self)
+        form.pack(side="left", fill="y", padx=8, pady=8)
+        tk.Label(form, text="Date (YYYY-MM-DD):").pack(anchor="w")
+        self.date_var = tk.StringVar(value=datetime.date.today().strftime("%Y-%m-%d"))
+        tk.Entry(form, textvariable=self.date_var).pack(fill="x", pady=4)
+        tk.Label(form, text="Customer Name:").pack(anchor="w")
+        self.name_var = tk.StringVar()
+        tk.Entry(form, textvariable=self.name_var).pack(fill="x", pady=4)
+        tk.Label(form, text="Services:").pack(anchor="w")
+        self.serv_listbox = tk.Listbox(form, selectmode="multiple", exportselection=False, height=7)
+        for s in services_catalog.keys():
+            self.serv_listbox.insert("end", s)
+        self.serv_listbox.pack(fill="x", pady=4)
+        tk.Label(form, text="Window (HH:MM - HH:MM):").pack(anchor="w")
+        win = tk.Frame(form)
+        win.pack(fill="x", pady=4)
+        self.earliest_var = tk.StringVar(value=DAY_OPEN)
+        self.latest_var = tk.StringVar(value=DAY_CLOSE)
+        tk.Entry(win, textvariable=self.earliest_var, width=7).pack(side="left")
+        tk.Label(win, text=" - ").pack(side="left")
+        tk.Entry(win, textvariable=self.latest_var, width=7).pack(side="left")
+        tk.Button(form, text="Add to Waiting List", command=self.add_request).pack(fill="x", pady=4)
+        tk.Button(form, text="Load List (CSV/JSON)", command=self.load_requests).pack(fill="x", pady=4)
+        tk.Button(form, text="Optimize", bg="#2980b9", fg="white", command=self.optimize).pack(fill="x", pady=4)
+        tk.Button(form, text="Book Plan", bg="#44bd32", fg="white", command=self.commit).pack(fill="x", pady=4)
+        self.status_var = tk.StringVar()
+        tk.Label(form, textvariable=self.status_var, justify="left", wraplength=220).pack(anchor="w", pady=8)
+
+        cols = ("Name", "Services", "Window", "Staff", "Start", "Wait")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=90, anchor="center")
+        self.tree.column("Services", width=220, anchor="w")
+        self.tree.column("Name", width=130, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=8, pady=8)
+
+    def add_request(self):
+        name = self.name_var.get().strip()
+        services = [self.serv_listbox.get(i) for i in self.serv_listbox.curselection()]
+        if not name or not name.replace(" ", "").isalpha() or not services:
+            messagebox.showerror("Invalid", "Enter a valid name and select services", parent=self)
+            return
+        try:
+            earliest = datetime.datetime.strptime(self.earliest_var.get().strip(), "%H:%M").strftime("%H:%M")
+            latest = datetime.datetime.strptime(self.latest_var.get().strip(), "%H:%M").strftime("%H:%M")
+        except ValueError:
+            messagebox.showerror("Format", "Window times must be HH:MM", parent=self)
+            return
+        self.requests.append({"name": name, "services": services, "earliest": earliest, "latest": latest})
+        self.name_var.set(""); self.serv_listbox.selection_clear(0, "end")
+        self.plan = []
+        self.show()
+
+    def load_requests(self):
+        path = filedialog.askopenfilename(parent=self, title="Load waiting list", filetypes=[("CSV / JSON", "*.csv *.json")])
+        if not path:
+            return
+        try:
+            rows = read_import_file(path)
+        except Exception as e:
+            messagebox.showerror("Load", f"Could not read file:\n{e}", parent=self)
+            return
+        catalog = {s.lower(): s for s in services_catalog}
+        for row in rows:
+            raw = row.get("services") or []
+            if isinstance(raw, str):
+                raw = raw.split(";")
+            services = [catalog[x.strip().lower()] for x in raw if x.strip().lower() in catalog]
+            if row.get("name") and services:
+                self.requests.append({"name": str(row["name"]).strip(), "services": services,
+                                      "earliest": row.get("earliest") or DAY_OPEN, "latest": row.get("latest") or DAY_CLOSE})
+        self.plan = []
+        self.show()
+
+    def optimize(self):
+        date = self.date_var.get().strip()
+        try:
+            datetime.datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Date", "Invalid date format", parent=self)
+            return
+        if not self.requests:
+            messagebox.showwarning("Plan", "Waiting list is empty", parent=self)
+            return
+        self.plan, unplaced = plan_day(date, self.requests)
+        self.show(unplaced)
+        minutes = sum(total_time(p["services"]) for p in self.plan)
+        self.status_var.set(f"Placed {len(self.plan)} of {len(self.requests)} customers\n"
+                            f"Booked time: {minutes} min\n"
+                            f"Total wait: {sum(p['wait'] for p in self.plan)} min")
+
+    def show(self, unplaced=()):
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        rows = self.plan if self.plan else self.requests
+        for r in rows:
+            window = f"{r['earliest']}-{r['latest']}" if "earliest" in r else ""
+            self.tree.insert("", "end", values=(r["name"], ", ".join(r["services"]), window,
+                                                r.get("staff", ""), r.get("time", ""), r.get("wait", "")))
+        for r in unplaced:
+            self.tree.insert("", "end", values=(r["name"], ", ".join(r["services"]),
+                                                f"{r.get('earliest', '')}-{r.get('latest', '')}", "(no slot)", "", ""))
+        if not self.plan:
+            self.status_var.set(f"{len(self.requests)} customers waiting")
+
+    def commit(self):
+        if not self.plan:
+            messagebox.showwarning("Plan", "Optimize the waiting list first", parent=self)
+            return
+        appts = [{k: p[k] for k in ("name", "services", "date", "time", "staff")} for p in self.plan]
+        commit_appointments(appts)
+        self.appointment_frame.refresh()
+        messagebox.showinfo("Booked", f"Booked {len(appts)} appointments", parent=self)
+        self.destroy()
+
 class StaffFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="white")
@@ -754,7 +3776,7 @@ class StaffFrame(tk.Frame):
         try: sal = int(salary)
         except: sal = 2000
         staffNames.append(name); staffSpecs.append(spec); staffSalaries.append(sal)
-        save_staff(); self.refresh()
+        save_staff(); publish("staff_changed"); self.refresh()
 
     def fire(self):
         sel = self.tree.selection()
@@ -765,7 +3787,7 @@ class StaffFrame(tk.Frame):
             if messagebox.askyesno("Confirm", f"Fire {name}?"):
                 idx = staffNames.index(name)
                 del staffNames[idx]; del staffSpecs[idx]; del staffSalaries[idx]
-                save_staff(); self.refresh()
+                save_staff(); publish("staff_changed"); self.refresh()
 
 class BillingFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -791,12 +3813,38 @@ class BillingFrame(tk.Frame):
         tk.Entry(left, textvariable=self.discount_var).pack(fill="x", padx=8, pady=6)
         tk.Button(left, text="Generate Invoice & Save Bill", bg="#2980b9", fg="white", command=self.generate_invoice).pack(pady=6)
         tk.Button(left, text="Clear", command=self.clear_form).pack(pady=6)
+        tk.Button(left, text="Bulk Checkout (Day)", command=lambda: BulkCheckoutDialog(self)).pack(pady=6)
 
         right = tk.Frame(frame, bg="white")
         right.place(x=380, y=10, width=780, height=560)
         tk.Label(right, text="Saved Bills (recent)", bg="white", font=("Arial", 12, "bold")).pack(anchor="w", padx=8, pady=8)
+        # filter bar: answered from the bitmap indexes over the whole ledger
+        bar = tk.Frame(right, bg="white")
+        bar.pack(fill="x", padx=8)
+        self.filter_staff = tk.StringVar()
+        self.filter_service = tk.StringVar()
+        self.filter_month = tk.StringVar()
+        self.filter_min = tk.StringVar()
+        self.filter_max = tk.StringVar()
+        tk.Label(bar, text="Staff", bg="white").pack(side="left")
+        staff_cb = ttk.Combobox(bar, textvariable=self.filter_staff, width=10, state="readonly")
+        staff_cb.configure(postcommand=lambda: staff_cb.configure(values=[""] + staffNames))
+        staff_cb.pack(side="left", padx=(2, 6))
+        tk.Label(bar, text="Service", bg="white").pack(side="left")
+        ttk.Combobox(bar, textvariable=self.filter_service, width=12, state="readonly",
+                     values=[""] + list(services_catalog)).pack(side="left", padx=(2, 6))
+        tk.Label(bar, text="Month (YYYY-MM)", bg="white").pack(side="left")
+        tk.Entry(bar, textvariable=self.filter_month, width=8).pack(side="left", padx=(2, 6))
+        tk.Label(bar, text="Final Rs", bg="white").pack(side="left")
+        tk.Entry(bar, textvariable=self.filter_min, width=6).pack(side="left", padx=2)
+        tk.Label(bar, text="to", bg="white").pack(side="left")
+        tk.Entry(bar, textvariable=self.filter_max, width=6).pack(side="left", padx=(2, 6))
+        tk.Button(bar, text="Filter", command=self.apply_filter).pack(side="left", padx=2)
+        tk.Button(bar, text="Clear", command=self.clear_filter).pack(side="left", padx=2)
+        self.filter_info = tk.StringVar()
+        tk.Label(right, textvariable=self.filter_info, bg="white", fg="#555").pack(anchor="w", padx=8)
         cols = ("ID","Name","Staff","Services","Total","Discount","Final","Date")
-        self.bill_tree = ttk.Treeview(right, columns=cols, show="headings", height=18)
+        self.bill_tree = ttk.Treeview(right, columns=cols, show="headings", height=15)
         for c in cols:
             self.bill_tree.heading(c, text=c)
             self.bill_tree.column(c, width=90)
@@ -809,49 +3857,52 @@ class BillingFrame(tk.Frame):
         self.refresh_bills()
 
     def print_selected_bill(self):
-        """Generate invoice PDF for selected bill record."""
-        selected = self.bill_tree.focus()
+        """Generate invoice PDF for the selected bill records (one page each)."""
+        selected = self.bill_tree.selection() or ((self.bill_tree.focus(),) if self.bill_tree.focus() else ())
         if not selected:
             messagebox.showwarning("Print", "Select a bill first")
             return
 
-        row = self.bill_tree.item(selected, "values")
-        if not row or len(row) < 8:
-            messagebox.showerror("Error", "Invalid record selected")
-            return
-
-        # --- FIX: Now includes staff so PDF will not crash ---
-        appointment_dummy = {
-            "id": row[0],
-            "name": row[1],
-            "services": row[3].split(";"),
-            "date": row[7],
-            "time": "",
-            "staff": row[2] if row[2].strip() else "Not Assigned"   # FIXED
-        }
+        invoices = []
+        for item in selected:
+            row = self.bill_tree.item(item, "values")
+            if not row or len(row) < 8:
+                messagebox.showerror("Error", "Invalid record selected")
+                return
 
-        total = float(row[4])
-        discount_amt = float(row[5])
-        final_amt = float(row[6])
+            # --- FIX: Now includes staff so PDF will not crash ---
+            appointment_dummy = {
+                "id": row[0],
+                "name": row[1],
+                "services": row[3].split(";"),
+                "date": row[7],
+                "time": "",
+                "staff": row[2] if row[2].strip() else "Not Assigned"   # FIXED
+            }
+            invoices.append((appointment_dummy, float(row[4]), float(row[5]), float(row[6])))
 
+        first_id = invoices[0][0]["id"]
         save_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF File", "*.pdf")],
-            initialfile=f"Invoice_{row[0]}.pdf"
+            initialfile=f"Invoice_{first_id}.pdf" if len(invoices) == 1 else f"Invoices_{first_id}_and_{len(invoices) - 1}_more.pdf"
         )
 
         if not save_path:
             return
 
         try:
-            create_invoice_pdf(save_path, appointment_dummy, total, discount_amt, final_amt)
+            # several invoices share one logo and page template in a single file
+            create_invoices_pdf(save_path, invoices)
             messagebox.showinfo("Success", f"Invoice saved:\n{save_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate PDF:\n{e}")
 
     def _refresh_appt_list(self):
         opts = []
-        for a in Appointments:
+        today = datetime.date.today()
+        window = [(today + datetime.timedelta(days=d)).isoformat() for d in (-RECURRING_VIEW_DAYS, RECURRING_VIEW_DAYS)]
+        for a in sorted(Appointments + list(iter_occurrences(*window)), key=lambda a: (a["date"], a["time"])):
             opts.append(f"{a['id']} | {a['name']} | {a['date']} {a['time']}")
         if not opts:
             opts = ["No appointments"]
@@ -863,8 +3914,7 @@ class BillingFrame(tk.Frame):
         if not sel or sel.startswith("No"):
             messagebox.showwarning("Select", "No appointment selected")
             return
-        aid = int(sel.split("|")[0].strip())
-        appt = next((x for x in Appointments if x["id"]==aid), None)
+        appt = find_appointment(sel.split("|")[0].strip())
         if not appt:
             messagebox.showerror("Error", "Appointment not found")
             return
@@ -924,6 +3974,14 @@ class BillingFrame(tk.Frame):
         self.refresh_bills()
         self._refresh_appt_list()
 
+    def watch_invoice_job(self, job, outpath, errors):
+        if job.is_alive():
+            self.after(200, self.watch_invoice_job, job, outpath, errors)
+        elif errors:
+            messagebox.showwarning("PDF", f"Could not create PDF: {errors[0]}")
+        else:
+            messagebox.showinfo("Invoice", f"Invoice PDF generated:\n{outpath}")
+
     def clear_form(self):
         self.services_text.delete("1.0", "end")
         self.discount_var.set("0")
@@ -935,21 +3993,50 @@ class BillingFrame(tk.Frame):
         for r in self.bill_tree.get_children():
             self.bill_tree.delete(r)
         try:
-            with open(BILL_FILE, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                rows = list(reader)
-                for row in reversed(rows[-200:]):
-                    self.bill_tree.insert("", "end", values=(row.get("ID",""), row.get("Name",""), row.get("Staff",""), row.get("Services",""), row.get("Total",""), row.get("Discount",""), row.get("Final",""), row.get("Date","")))
+            rows = deque(scan_csv(BILL_FILE, BILL_HEADERS), maxlen=200)
+            for values in reversed(rows):
+                self.bill_tree.insert("", "end", values=values)
         except FileNotFoundError:
             pass
 
+    def apply_filter(self):
+        """Show the newest bills matching the filter bar, from the whole ledger."""
+        month = self.filter_month.get().strip() or None
+        try:
+            if month:
+                datetime.datetime.strptime(month, "%Y-%m")
+            lo = float(self.filter_min.get()) if self.filter_min.get().strip() else None
+            hi = float(self.filter_max.get()) if self.filter_max.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Filter", "Month must be YYYY-MM and amounts must be numbers")
+            return
+        started = perf_counter()
+        count, total, rows = query_bills(self.filter_staff.get() or None, self.filter_service.get() or None,
+                                         month, lo, hi, limit=200)
+        elapsed = (perf_counter() - started) * 1000
+        for r in self.bill_tree.get_children():
+            self.bill_tree.delete(r)
+        for values in rows:
+            self.bill_tree.insert("", "end", values=values)
+        shown = f", showing newest {len(rows)}" if len(rows) < count else ""
+        self.filter_info.set(f"{count} bills, Rs {total:.2f}{shown} ({elapsed:.0f} ms)")
+
+    def clear_filter(self):
+        for var in (self.filter_staff, self.filter_service, self.filter_month, self.filter_min, self.filter_max):
+            var.set("")
+        self.filter_info.set("")
+        self.refresh_bills()
+
     def export_bills_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")], title="Export bills to CSV")
         if not path:
             return
         try:
-            with open(BILL_FILE, newline="", encoding="utf-8") as src, open(path, "w", newline="", encoding="utf-8") as dst:
-                dst.write(src.read())
+            # full history: archived months followed by the hot ledger
+            with open(path, "w", newline="", encoding="utf-8") as dst:
+                writer = csv.DictWriter(dst, fieldnames=BILL_HEADERS, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(iter_bill_rows())
             messagebox.showinfo("Exported", f"Bills exported to {path}")
         except Exception as e:
             messagebox.showerror("Error", f"Could not export: {e}")
@@ -983,6 +4070,122 @@ class BillingFrame(tk.Frame):
         except Exception as ee:
             messagebox.showerror("Error", f"Failed: {ee}")
 
+class BulkCheckoutDialog(tk.Toplevel):
+    """Bill every unbilled appointment of a day in one go."""
+    def __init__(self, billing_frame):
+        super().__init__(billing_frame)
+        self.billing_frame = billing_frame
+        self.title("Bulk Checkout")
+        self.geometry("1000x560")
+        self.bills = []
+        rules = load_discount_rules()
+
+        form = tk.Frame(self)
+        form.pack(side="left", fill="y", padx=8, pady=8)
+        tk.Label(form, text="Date (YYYY-MM-DD):").pack(anchor="w")
+        self.date_var = tk.StringVar(value=datetime.date.today().strftime("%Y-%m-%d"))
+        tk.Entry(form, textvariable=self.date_var).pack(fill="x", pady=4)
+        tk.Label(form, text="Default Discount (%):").pack(anchor="w")
+        self.default_var = tk.StringVar(value=f"{rules['default']:g}")
+        tk.Entry(form, textvariable=self.default_var).pack(fill="x", pady=4)
+        tk.Label(form, text="Service discounts (Facial=10, ...):").pack(anchor="w")
+        self.services_var = tk.StringVar(value=", ".join(f"{k}={v:g}" for k, v in rules["services"].items()))
+        tk.Entry(form, textvariable=self.services_var, width=34).pack(fill="x", pady=4)
+        tk.Label(form, text="Customer discounts (Riya Sharma=15, ...):").pack(anchor="w")
+        self.customers_var = tk.StringVar(value=", ".join(f"{k}={v:g}" for k, v in rules["customers"].items()))
+        tk.Entry(form, textvariable=self.customers_var, width=34).pack(fill="x", pady=4)
+        self.invoices_var = tk.BooleanVar(value=REPORTLAB_AVAILABLE)
+        tk.Checkbutton(form, text="Generate invoices PDF", variable=self.invoices_var).pack(anchor="w", pady=4)
+        tk.Button(form, text="Preview", command=self.preview).pack(fill="x", pady=4)
+        tk.Button(form, text="Checkout All", bg="#2980b9", fg="white", command=self.checkout).pack(fill="x", pady=4)
+        self.status_var = tk.StringVar()
+        tk.Label(form, textvariable=self.status_var, justify="left", wraplength=240).pack(anchor="w", pady=8)
+
+        cols = ("ID", "Name", "Staff", "Services", "Total", "Discount", "Final")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=80, anchor="center")
+        self.tree.column("Services", width=220, anchor="w")
+        self.tree.column("Name", width=130, anchor="w")
+        self.tree.pack(fill="both", expand=True, padx=8, pady=8)
+
+    def _parse_pairs(self, text):
+        pairs = {}
+        for part in text.split(","):
+            if not part.strip():
+                continue
+            key, _, pct = part.partition("=")
+            value = float(pct)
+            if not key.strip() or not (0 <= value <= 100):
+                raise ValueError(part)
+            pairs[key.strip()] = value
+        return pairs
+
+    def read_rules(self):
+        try:
+            rules = {"default": float(self.default_var.get() or 0),
+                     "services": self._parse_pairs(self.services_var.get()),
+                     "customers": self._parse_pairs(self.customers_var.get())}
+        except ValueError:
+            messagebox.showerror("Invalid Discount", "Discounts must be Name=percent pairs between 0 and 100.", parent=self)
+            return None
+        if not (0 <= rules["default"] <= 100):
+            messagebox.showerror("Invalid Discount", "Discount must be between 0 and 100.", parent=self)
+            return None
+        return rules
+
+    def preview(self):
+        date = self.date_var.get().strip()
+        try:
+            datetime.datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Date", "Invalid date format", parent=self)
+            return False
+        rules = self.read_rules()
+        if rules is None:
+            return False
+        self.bills = price_checkout(unbilled_appointments(date), rules)
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        for a, total, discount_amt, final_amt in self.bills:
+            self.tree.insert("", "end", values=(a["id"], a["name"], a["staff"], ", ".join(a["services"]),
+                                                f"{total:.2f}", f"{discount_amt:.2f}", f"{final_amt:.2f}"))
+        self.status_var.set(f"{len(self.bills)} unbilled appointments\n"
+                            f"Total: Rs {sum(b[1] for b in self.bills):.2f}\n"
+                            f"Discount: Rs {sum(b[2] for b in self.bills):.2f}\n"
+                            f"Final: Rs {sum(b[3] for b in self.bills):.2f}")
+        return True
+
+    def checkout(self):
+        if not self.preview():
+            return
+        if not self.bills:
+            messagebox.showinfo("Checkout", "Nothing to bill for this date", parent=self)
+            return
+        if not messagebox.askyesno("Checkout", f"Save {len(self.bills)} bills?", parent=self):
+            return
+        save_discount_rules(self.read_rules())
+        bills = self.bills
+        save_bill_records(bills)
+        self.billing_frame.refresh_bills()
+        self.billing_frame._refresh_appt_list()
+        if self.invoices_var.get() and REPORTLAB_AVAILABLE:
+            outdir = filedialog.askdirectory(parent=self, title="Select folder to save invoices PDF") or os.getcwd()
+            outpath = os.path.join(outdir, f"invoices_{self.date_var.get().strip()}.pdf")
+            # render off the UI thread; the billing screen stays usable meanwhile
+            errors = []
+            def render():
+                try:
+                    create_invoices_pdf(outpath, bills)
+                except Exception as e:
+                    errors.append(e)
+            job = threading.Thread(target=render, daemon=True)
+            job.start()
+            self.billing_frame.watch_invoice_job(job, outpath, errors)
+        messagebox.showinfo("Checkout", f"Saved {len(bills)} bills", parent=self)
+        self.destroy()
+
 class DailyReportFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="white")
@@ -998,6 +4201,11 @@ class DailyReportFrame(tk.Frame):
         tk.Button(ctrl, text="Export CSV", command=self.export_csv).pack(side="left", padx=6)
         tk.Button(ctrl, text="Export PDF", command=self.export_pdf).pack(side="left", padx=6)
         tk.Button(ctrl, text="Print PDF", command=self.print_pdf).pack(side="left", padx=6)
+        tk.Label(ctrl, text="   Range To:", bg="white").pack(side="left")
+        self.to_var = tk.StringVar(value=datetime.date.today().strftime("%Y-%m-%d"))
+        tk.Entry(ctrl, textvariable=self.to_var, width=12).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Range Report PDF", command=self.export_range_pdf).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Audit Bookings", command=self.audit).pack(side="left", padx=6)
 
         # report area
         self.text = tk.Text(frame)
@@ -1012,33 +4220,14 @@ class DailyReportFrame(tk.Frame):
         except Exception:
             messagebox.showerror("Date", "Invalid date format")
             return
-        rows = []
-        totals = {"income": 0.0, "customers": 0}
-        service_counter = Counter()
-        staff_counter = Counter()
-        try:
-            with open(BILL_FILE, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get("Date") != target:
-                        continue
-                    rows.append(row)
-                    try:
-                        totals["income"] += float(row.get("Final",0))
-                        totals["customers"] += 1
-                    except:
-                        pass
-                    for s in row.get("Services","").split(";"):
-                        service_counter[s.strip()] += 1
-                    staff_counter[row.get("Staff","")] += 1
-        except FileNotFoundError:
+        rows = list(iter_bill_rows(target, target))
+        if not rows and not os.path.exists(BILL_FILE) and not archived_months("bills"):
             messagebox.showinfo("No Data", "No billing records found")
             return
 
-        top_service = service_counter.most_common(1)[0][0] if service_counter else "-"
-        top_staff = staff_counter.most_common(1)[0][0] if staff_counter else "-"
-        totals["top_service"] = top_service
-        totals["top_staff"] = top_staff
+        totals = daily_report_totals(rows)
+        top_service = totals["top_service"]
+        top_staff = totals["top_staff"]
 
         self.report_rows = rows
         self.report_totals = totals
@@ -1087,6 +4276,63 @@ class DailyReportFrame(tk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to create PDF: {e}")
 
+    def export_range_pdf(self):
+        first, last = self.date_var.get().strip(), self.to_var.get().strip()
+        try:
+            datetime.datetime.strptime(first, "%Y-%m-%d"); datetime.datetime.strptime(last, "%Y-%m-%d")
+        except Exception:
+            messagebox.showerror("Date", "Invalid date format")
+            return
+        if first > last:
+            messagebox.showerror("Date", "Report date must not be after the range end")
+            return
+        if not REPORTLAB_AVAILABLE:
+            messagebox.showwarning("PDF", "reportlab not installed")
+            return
+        sections, summary = build_range_report(first, last)
+        if not sections:
+            messagebox.showinfo("No Data", "No billing records in this range")
+            return
+        self.text.delete("1.0", "end")
+        self.text.insert("end", f"Report - {first} to {last}\n")
+        self.text.insert("end", f"Total Income: Rs {summary['income']:.2f}\n")
+        self.text.insert("end", f"Customers Served: {summary['customers']}\n")
+        self.text.insert("end", f"Top Service: {summary['top_service']}\n")
+        self.text.insert("end", f"Top Staff: {summary['top_staff']}\n\n")
+        for sec in sections:
+            self.text.insert("end", f"{sec['date']} | Customers: {sec['totals']['customers']} | Income: Rs {sec['totals']['income']:.2f}\n")
+        outdir = filedialog.askdirectory(title="Select folder to save report PDF") or os.getcwd()
+        outpath = os.path.join(outdir, f"report_{first}_to_{last}.pdf")
+        try:
+            create_range_report_pdf(outpath, first, last, sections, summary)
+            messagebox.showinfo("Saved", f"PDF saved: {outpath}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create PDF: {e}")
+
+    def audit(self):
+        appts = _audit_appointments()   # stored rows are copied here; the archive is read by the worker
+        result = {}
+        def work():
+            started = perf_counter()
+            result["audit"] = audit_bookings(appts)
+            result["seconds"] = perf_counter() - started
+        job = threading.Thread(target=work, daemon=True)
+        job.start()
+        self.text.delete("1.0", "end")
+        self.text.insert("end", "Auditing bookings...\n")
+        self.after(100, self.watch_audit, job, result)
+
+    def watch_audit(self, job, result):
+        if job.is_alive():
+            self.after(100, self.watch_audit, job, result)
+            return
+        self.text.delete("1.0", "end")
+        if "audit" not in result:
+            self.text.insert("end", "Audit failed, see the console for details.\n")
+            return
+        self.text.insert("end", "\n".join(format_audit(result["audit"], limit=AUDIT_SHOW_LIMIT)))
+        self.text.insert("end", f"\n({result['seconds']:.2f}s; run  python BDUI.py --audit  for the full list)\n")
+
     def print_pdf(self):
         if not self.report_rows:
             messagebox.showwarning("Generate", "Generate the report first")
@@ -1108,9 +4354,450 @@ class DailyReportFrame(tk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to create PDF: {e}")
 
+class StaffAnalyticsFrame(tk.Frame):
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg="white")
+        tk.Label(self, text="STAFF ANALYTICS", font=("Arial", 16, "bold"), bg="white").pack(pady=8)
+        frame = tk.Frame(self, bg="white")
+        frame.pack(fill="both", expand=True, padx=12, pady=8)
+        ctrl = tk.Frame(frame, bg="white")
+        ctrl.pack(anchor="w", padx=8, pady=8)
+        today = datetime.date.today()
+        tk.Label(ctrl, text="From (YYYY-MM):", bg="white").pack(side="left")
+        self.from_var = tk.StringVar(value=f"{today.year - 1}-{today.month:02d}")
+        tk.Entry(ctrl, textvariable=self.from_var, width=9).pack(side="left", padx=6)
+        tk.Label(ctrl, text="To:", bg="white").pack(side="left")
+        self.to_var = tk.StringVar(value=today.strftime("%Y-%m"))
+        tk.Entry(ctrl, textvariable=self.to_var, width=9).pack(side="left", padx=6)
+        tk.Label(ctrl, text="Staff:", bg="white").pack(side="left")
+        self.staff_var = tk.StringVar(value="All")
+        self.staff_cb = ttk.Combobox(ctrl, textvariable=self.staff_var, state="readonly", width=16)
+        self.staff_cb.pack(side="left", padx=6)
+        self.by_month_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(ctrl, text="Per month", variable=self.by_month_var, bg="white").pack(side="left", padx=6)
+        tk.Button(ctrl, text="Show", command=self.refresh).pack(side="left", padx=6)
+
+        cols = ("Month", "Staff", "Booked (h)", "Bills", "Revenue", "Avg Ticket", "Revenue / Salary")
+        self.tree = ttk.Treeview(frame, columns=cols, show="headings", height=22)
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=130, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=8, pady=6)
+
+    def refresh(self):
+        self.staff_cb['values'] = ["All"] + staffNames
+        first, last = self.from_var.get().strip(), self.to_var.get().strip()
+        staff_filter = self.staff_var.get()
+        rows = {}
+        for month, per_staff in staff_monthly_rollups().items():
+            if not (first <= month <= last):
+                continue
+            for staff, e in per_staff.items():
+                if staff_filter != "All" and staff != staff_filter:
+                    continue
+                key = (month, staff) if self.by_month_var.get() else (f"{first} .. {last}", staff)
+                agg = rows.setdefault(key, {"minutes": 0, "revenue": 0.0, "bills": 0, "salary": 0})
+                agg["minutes"] += e["minutes"]; agg["revenue"] += e["revenue"]; agg["bills"] += e["bills"]
+                agg["salary"] += e["salary"]
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        for (month, staff), agg in sorted(rows.items(), key=lambda kv: (kv[0][0], -kv[1]["revenue"])):
+            avg = agg["revenue"] / agg["bills"] if agg["bills"] else 0
+            ratio = f"{agg['revenue'] / agg['salary']:.2f}" if agg["salary"] else "-"
+            self.tree.insert("", "end", values=(month, staff, f"{agg['minutes'] / 60:.1f}", agg["bills"],
+                                                f"{agg['revenue']:.2f}", f"{avg:.2f}", ratio))
+
+class OccupancyFrame(tk.Frame):
+    """Busy chairs by weekday and 15-minute slot over any date range, and a forecast for next week."""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg="white")
+        tk.Label(self, text="OCCUPANCY", font=("Arial", 16, "bold"), bg="white").pack(pady=8)
+        ctrl = tk.Frame(self, bg="white")
+        ctrl.pack(anchor="w", padx=20, pady=4)
+        today = datetime.date.today()
+        tk.Label(ctrl, text="From (YYYY-MM-DD):", bg="white").pack(side="left")
+        self.from_var = tk.StringVar(value=(today - datetime.timedelta(weeks=12)).isoformat())
+        tk.Entry(ctrl, textvariable=self.from_var, width=11).pack(side="left", padx=6)
+        tk.Label(ctrl, text="To:", bg="white").pack(side="left")
+        self.to_var = tk.StringVar(value=today.isoformat())
+        tk.Entry(ctrl, textvariable=self.to_var, width=11).pack(side="left", padx=6)
+        tk.Label(ctrl, text="Staff:", bg="white").pack(side="left")
+        self.staff_var = tk.StringVar(value="All")
+        self.staff_cb = ttk.Combobox(ctrl, textvariable=self.staff_var, state="readonly", width=16)
+        self.staff_cb.pack(side="left", padx=6)
+        tk.Label(ctrl, text="Service:", bg="white").pack(side="left")
+        self.service_var = tk.StringVar(value="All")
+        ttk.Combobox(ctrl, textvariable=self.service_var, state="readonly", width=14,
+                     values=["All"] + list(services_catalog)).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Heatmap", command=self.show_heatmap).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Forecast Next Week", command=self.show_forecast).pack(side="left", padx=6)
+        self.status_var = tk.StringVar()
+        tk.Label(self, textvariable=self.status_var, bg="white", fg="#555").pack(anchor="w", padx=20)
+
+        self.fig = Figure(figsize=(10, 4.5), dpi=90)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=12, pady=6)
+
+    def refresh(self):
+        self.staff_cb['values'] = ["All"] + staffNames
+
+    def filters(self):
+        staff, service = self.staff_var.get(), self.service_var.get()
+        return (None if staff == "All" else staff), (None if service == "All" else service)
+
+    def show_heatmap(self):
+        if not NUMPY_AVAILABLE:
+            messagebox.showwarning("Occupancy", "numpy not installed")
+            return
+        first, last = self.from_var.get().strip(), self.to_var.get().strip()
+        try:
+            datetime.date.fromisoformat(first); datetime.date.fromisoformat(last)
+        except ValueError:
+            messagebox.showerror("Date", "Invalid date format")
+            return
+        if first > last:
+            messagebox.showerror("Date", "From must not be after To")
+            return
+        started = perf_counter()
+        grid = occupancy.weekday_profile(first, last, *self.filters())
+        self.draw(grid, list(calendar.day_abbr), f"Average busy chairs, {first} to {last}", perf_counter() - started)
+
+    def show_forecast(self):
+        if not NUMPY_AVAILABLE:
+            messagebox.showwarning("Occupancy", "numpy not installed")
+            return
+        start = datetime.date.today() + datetime.timedelta(days=1)
+        started = perf_counter()
+        grid = occupancy.forecast_week(start, staff=self.filters()[0], service=self.filters()[1])
+        days = [(start + datetime.timedelta(days=i)).strftime("%a %d %b") for i in range(7)]
+        self.draw(grid, days, f"Forecast busy chairs from {start} (last {OCCUPANCY_FORECAST_WEEKS} weeks)",
+                  perf_counter() - started)
+
+    def draw(self, grid, row_labels, title, seconds):
+        # opening hours, widened to any slot that has bookings
+        lo = time_to_minutes(DAY_OPEN) // SLOT_MINUTES
+        hi = -(-time_to_minutes(DAY_CLOSE) // SLOT_MINUTES)
+        busy = np.flatnonzero(grid.any(axis=0))
+        if busy.size:
+            lo, hi = min(lo, busy[0]), max(hi, busy[-1] + 1)
+        grid = grid[:, lo:hi]
+        self.fig.clf()
+        ax = self.fig.add_subplot(111)
+        image = ax.imshow(grid, aspect="auto", cmap="YlOrRd", interpolation="nearest")
+        self.fig.colorbar(image, ax=ax, label="Busy chairs")
+        per_hour = 60 // SLOT_MINUTES
+        ticks = [i for i in range(hi - lo) if (lo + i) % per_hour == 0]
+        ax.set_xticks(ticks)
+        ax.set_xticklabels([f"{(lo + i) // per_hour:02d}:00" for i in ticks], fontsize=8)
+        ax.set_yticks(range(len(row_labels)))
+        ax.set_yticklabels(row_labels, fontsize=8)
+        ax.set_title(title)
+        self.canvas.draw_idle()
+        if grid.size and grid.max() > 0:
+            row, col = np.unravel_index(int(grid.argmax()), grid.shape)
+            minute = (lo + col) * SLOT_MINUTES
+            peak = f"Busiest: {row_labels[row]} {minute // 60:02d}:{minute % 60:02d} ({grid[row, col]:.1f} chairs)"
+        else:
+            peak = "No bookings"
+        self.status_var.set(f"{peak}   [{seconds * 1000:.0f} ms]")
+
+class WalkInFrame(tk.Frame):
+    """Queue board: walk-ins per staff member with live wait estimates."""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg="white")
+        tk.Label(self, text="WALK-IN QUEUE", font=("Arial", 16, "bold"), bg="white").pack(pady=8)
+        frame = tk.Frame(self, bg="white")
+        frame.pack(fill="both", expand=True, padx=12, pady=8)
+
+        left = tk.Frame(frame, bg="white", bd=1, relief="solid")
+        left.place(x=10, y=10, width=300, height=560)
+        tk.Label(left, text="New Walk-in", bg="white", font=("Arial", 12, "bold")).pack(pady=8)
+        tk.Label(left, text="Customer Name:", bg="white").pack(anchor="w", padx=8)
+        self.name_var = tk.StringVar()
+        tk.Entry(left, textvariable=self.name_var).pack(fill="x", padx=8, pady=4)
+        tk.Label(left, text="Select Services (Ctrl+Click):", bg="white").pack(anchor="w", padx=8)
+        self.serv_listbox = tk.Listbox(left, selectmode="multiple", exportselection=False, height=8)
+        for s in services_catalog.keys():
+            self.serv_listbox.insert("end", s)
+        self.serv_listbox.pack(fill="both", padx=8, pady=4)
+        self.priority_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(left, text="Priority", variable=self.priority_var, bg="white").pack(anchor="w", padx=8)
+        tk.Button(left, text="Join Queue", bg="#44bd32", fg="white", command=self.join).pack(pady=6)
+
+        right = tk.Frame(frame, bg="white")
+        right.place(x=320, y=10, width=900, height=560)
+        cols = ("Services", "Priority", "Joined", "Est. Wait", "Est. Start")
+        self.tree = ttk.Treeview(right, columns=cols, show="tree headings", height=20)
+        self.tree.heading("#0", text="Staff / Customer")
+        self.tree.column("#0", width=300)
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=110, anchor="center")
+        self.tree.column("Services", width=220, anchor="w")
+        self.tree.pack(fill="both", padx=8, pady=8)
+        ctl = tk.Frame(right, bg="white")
+        ctl.pack(fill="x", padx=8, pady=6)
+        tk.Button(ctl, text="Start Next", command=self.start_next).pack(side="left", padx=6)
+        tk.Button(ctl, text="Finish Service", command=self.finish).pack(side="left", padx=6)
+        tk.Button(ctl, text="Remove Walk-in", command=self.remove).pack(side="left", padx=6)
+
+        self._redraw_job = None
+        subscribe("walkins_changed", self.schedule_redraw)
+        subscribe("staff_changed", self.schedule_redraw)
+        self.redraw()
+        self.tick()
+
+    def tick(self):
+        # waits shrink and services run over as time passes, without any event
+        self.schedule_redraw()
+        self.after(WALKIN_BOARD_TICK_MS, self.tick)
+
+    def schedule_redraw(self):
+        if self._redraw_job is None:
+            self._redraw_job = self.after(DASHBOARD_REDRAW_MS, self.redraw)
+
+    def redraw(self):
+        self._redraw_job = None
+        now = datetime.datetime.now()
+        focus = self.tree.focus()
+        for iid in self.tree.get_children():
+            self.tree.delete(iid)
+        for staff in staffNames:
+            q = walkins.queues.get(staff)
+            if q is None or q.current is None:
+                status = "idle"
+            else:
+                over = (now - q.ends).total_seconds() / 60
+                left = f"over by {over:.0f} min" if over > 0 else f"{q.remaining(now):.0f} min left"
+                status = f"serving {q.current['name']} ({left})"
+            waiting = walkins.waiting(staff)
+            iid = "staff:" + staff
+            self.tree.insert("", "end", iid=iid, text=f"{staff} - {status}", values=("", "", "", "", f"{len(waiting)} waiting"), open=True)
+            for t in waiting:
+                wait = walkins.estimated_wait(t, now)
+                start = now + datetime.timedelta(minutes=wait)
+                self.tree.insert(iid, "end", iid=f"t{t['id']}", text=t["name"],
+                                 values=(", ".join(t["services"]), WALKIN_LEVELS[t["level"]], t["joined"].strftime("%H:%M"),
+                                         f"{wait:.0f} min", start.strftime("%H:%M")))
+        if focus and self.tree.exists(focus):
+            self.tree.focus(focus)
+            self.tree.selection_set(focus)
+
+    def _selected_staff(self):
+        iid = self.tree.focus()
+        if not iid:
+            messagebox.showwarning("Select", "Select a staff member or walk-in first")
+            return None
+        parent = self.tree.parent(iid) or iid
+        return parent[len("staff:"):]
+
+    def join(self):
+        name = self.name_var.get().strip()
+        services = [self.serv_listbox.get(i) for i in self.serv_listbox.curselection()]
+        if not name or not services:
+            messagebox.showerror("Invalid", "Enter a name and select services")
+            return
+        level = 0 if self.priority_var.get() else len(WALKIN_LEVELS) - 1
+        try:
+            ticket = walkins.join(name, services, level)
+        except ValueError as e:
+            messagebox.showerror("Walk-in", str(e))
+            return
+        wait = walkins.estimated_wait(ticket)
+        messagebox.showinfo("Walk-in", f"{name} is queued with {ticket['staff']}, estimated wait {wait:.0f} min")
+        self.name_var.set(""); self.serv_listbox.selection_clear(0, "end"); self.priority_var.set(False)
+
+    def start_next(self):
+        staff = self._selected_staff()
+        if not staff:
+            return
+        try:
+            ticket = walkins.start_next(staff)
+        except ValueError as e:
+            messagebox.showerror("Walk-in", str(e))
+            return
+        if ticket is None:
+            messagebox.showinfo("Walk-in", f"No walk-ins waiting that {staff} can serve")
+
+    def finish(self):
+        staff = self._selected_staff()
+        if staff:
+            walkins.finish(staff)
+
+    def remove(self):
+        iid = self.tree.focus()
+        if not iid.startswith("t"):
+            messagebox.showwarning("Select", "Select a walk-in first")
+            return
+        walkins.leave(int(iid[1:]))
+
+class HeadOfficeFrame(tk.Frame):
+    """Consolidated figures across all branch folders, with a branch filter."""
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg="white")
+        self.aggregates = None
+        self.view = None
+        tk.Label(self, text="HEAD OFFICE", font=("Arial", 16, "bold"), bg="white").pack(pady=8)
+        ctrl = tk.Frame(self, bg="white")
+        ctrl.pack(anchor="w", padx=20, pady=4)
+        tk.Label(ctrl, text="Branch:", bg="white").pack(side="left")
+        self.branch_var = tk.StringVar(value="All branches")
+        self.branch_cb = ttk.Combobox(ctrl, textvariable=self.branch_var, state="readonly", width=18)
+        self.branch_cb.pack(side="left", padx=6)
+        self.branch_cb.bind("<<ComboboxSelected>>", lambda e: self.show())
+        tk.Label(ctrl, text="From (YYYY-MM-DD):", bg="white").pack(side="left")
+        self.from_var = tk.StringVar()
+        tk.Entry(ctrl, textvariable=self.from_var, width=11).pack(side="left", padx=6)
+        tk.Label(ctrl, text="To:", bg="white").pack(side="left")
+        self.to_var = tk.StringVar()
+        tk.Entry(ctrl, textvariable=self.to_var, width=11).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Show", command=self.show).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Reload Branches", command=self.reload).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Add Branch Folder", command=self.add_branch).pack(side="left", padx=6)
+        tk.Button(ctrl, text="Export CSV", command=self.export_csv).pack(side="left", padx=6)
+        self.status_var = tk.StringVar()
+        tk.Label(self, textvariable=self.status_var, bg="white", fg="#555").pack(anchor="w", padx=20)
+
+        body = tk.Frame(self, bg="white")
+        body.pack(fill="both", expand=True, padx=12, pady=6)
+        cols = ("Branch", "Staff", "Appointments", "Bills", "Revenue", "Avg Ticket", "Top Service", "Top Staff")
+        self.tree = ttk.Treeview(body, columns=cols, show="headings", height=14)
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=95, anchor="center")
+        self.tree.pack(side="left", fill="both", expand=True, padx=8)
+        fig = Figure(figsize=(5.5, 4.5), dpi=90)
+        self.ax = fig.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(fig, master=body)
+        self.canvas.get_tk_widget().pack(side="left", fill="both", padx=8)
+
+    def reload(self):
+        branches = load_branch_list()
+        self.status_var.set(f"Loading {len(branches)} branch(es)...")
+        result = {}
+        def work():
+            started = perf_counter()
+            try:
+                result["aggregates"], result["failed"] = load_branches(branches)
+            except Exception as e:
+                result["error"] = e
+            result["seconds"] = perf_counter() - started
+        job = threading.Thread(target=work, daemon=True)
+        job.start()
+        self.after(100, self.watch_load, job, result)
+
+    def watch_load(self, job, result):
+        if job.is_alive():
+            self.after(100, self.watch_load, job, result)
+            return
+        if "error" in result:
+            self.status_var.set(f"Could not load branches: {result['error']}")
+            return
+        self.aggregates = result["aggregates"]
+        self.branch_cb["values"] = ["All branches"] + [a["branch"] for a in self.aggregates]
+        status = f"{len(self.aggregates)} branch(es) loaded in {result['seconds']:.2f}s"
+        if result["failed"]:
+            status += "; skipped " + "; ".join(f"{name} ({error})" for name, error in result["failed"])
+        self.status_var.set(status)
+        self.show()
+
+    def show(self):
+        if self.aggregates is None:
+            return
+        branch = self.branch_var.get()
+        self.view = merge_branch_aggregates(self.aggregates, None if branch == "All branches" else branch,
+                                            self.from_var.get().strip(), self.to_var.get().strip() or "9999-12-31")
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        rows = list(self.view["branches"].items())
+        if len(rows) > 1:
+            rows.append(("All branches", self.view["total"]))
+        for name, t in rows:
+            avg = t["revenue"] / t["bills"] if t["bills"] else 0
+            top_service = t["services"].most_common(1)[0][0] if t["services"] else "-"
+            top_staff = t["staff_revenue"].most_common(1)[0][0] if t["staff_revenue"] else "-"
+            if isinstance(top_staff, tuple):
+                top_staff = f"{top_staff[1]} ({top_staff[0]})"
+            self.tree.insert("", "end", values=(name, t["staff"], t["appointments"], t["bills"],
+                                                f"{t['revenue']:.2f}", f"{avg:.2f}", top_service, top_staff))
+        ax = self.ax
+        ax.clear()
+        months = list(self.view["months"])
+        if months:
+            ax.bar(range(len(months)), list(self.view["months"].values()), color="#40739e")
+            ax.set_xticks(range(len(months)))
+            ax.set_xticklabels(months, rotation=45, fontsize=7)
+            ax.set_title(f"Monthly Revenue - {branch}")
+            ax.set_ylabel("Revenue (Rupees)")
+        else:
+            ax.text(0.3, 0.5, "No data", fontsize=14)
+        self.canvas.draw_idle()
+
+    def add_branch(self):
+        directory = filedialog.askdirectory(title="Select a branch data folder")
+        if not directory:
+            return
+        name = simpledialog.askstring("Branch Name", "Name:", parent=self, initialvalue=os.path.basename(directory))
+        if not name:
+            return
+        branches = load_branch_list()
+        branches.append({"name": name, "dir": directory})
+        save_branch_list(branches)
+        self.reload()
+
+    def export_csv(self):
+        if self.view is None:
+            messagebox.showwarning("Export", "Load the branches first")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")], title="Export head office report")
+        if not path:
+            return
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Branch", "Staff", "Appointments", "Bills", "Revenue"])
+            for name, t in self.view["branches"].items():
+                writer.writerow([name, t["staff"], t["appointments"], t["bills"], f"{t['revenue']:.2f}"])
+            writer.writerow([])
+            writer.writerow(["Month", "Revenue"])
+            for month, revenue in self.view["months"].items():
+                writer.writerow([month, f"{revenue:.2f}"])
+        messagebox.showinfo("Exported", f"Report exported to {path}")
+
 # ----------------- Run App -----------------
 if __name__ == "__main__":
-    load_staff()
-    load_appointments()
-    app = BellaDeskApp()
-    app.mainloop()
+    parser = argparse.ArgumentParser(description="BellaDesk salon management")
+    parser.add_argument("--enable-sync", type=int, metavar="TERMINAL",
+                        help=f"turn on sync for this data folder; TERMINAL is a number 1-{SYNC_ID_STRIDE - 1} unique to this terminal")
+    parser.add_argument("--sync", metavar="URL", help="exchange changes with the terminal at URL (e.g. http://10.0.0.5:8765) and exit")
+    parser.add_argument("--serve-sync", action="store_true", help="serve sync requests without opening the window")
+    parser.add_argument("--host", default="127.0.0.1", help="address to serve sync on, also from the window (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=SYNC_PORT, help=f"sync port (default {SYNC_PORT})")
+    parser.add_argument("--audit", action="store_true",
+                        help="report overlapping bookings, overloaded staff and skill mismatches, and exit")
+    args = parser.parse_args()
+    if args.enable_sync is not None or args.audit or args.sync or args.serve_sync:
+        load_staff()   # the window loads its own data after archiving closed months
+        load_appointments()
+    if args.enable_sync is not None:
+        enable_sync(args.enable_sync)
+        print(f"Sync enabled as terminal {args.enable_sync} ({sync_state()['origin']})")
+    if args.audit:
+        print("\n".join(format_audit(audit_bookings())))
+    if args.sync or args.serve_sync:
+        track_sync_changes()
+        if args.sync:
+            sent, received = sync_with(args.sync)
+            print(f"Sent {sent} change(s), received {received}")
+        if args.serve_sync:
+            server = start_sync_server(args.port, args.host)
+            print(f"Serving sync on http://{args.host}:{args.port} (Ctrl+C to stop)")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                server.shutdown()
+    elif args.enable_sync is None and not args.audit:
+        app = BellaDeskApp(sync_host=args.host, sync_port=args.port)
+        app.mainloop()
@@ -0,0 +1,91 @@
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import BDUI
+
+STAFF = ["Asha", "Rohit", "Meena", "Not Assigned"]
+SERVICES = ["Haircut", "Facial", "Manicure", "Massage", "Hair Coloring", "Shaving"]
+
+
+def random_appointments(rng, count):
+    out = []
+    for i in range(1, count + 1):
+        day = datetime.date(2025, 11, 1) + datetime.timedelta(days=rng.randrange(4))
+        out.append({"id": i, "name": f"C{i}", "services": rng.sample(SERVICES, rng.randint(1, 2)),
+                    "date": day.isoformat(), "time": f"{rng.randint(9, 23):02d}:{rng.choice([0, 15, 30, 45]):02d}",
+                    "staff": rng.choice(STAFF)})
+    return out
+
+
+def span(a):
+    start = datetime.datetime.fromisoformat(f"{a['date']} {a['time']}")
+    return start, start + datetime.timedelta(minutes=BDUI.total_time(a["services"]))
+
+
+def stamp(t):
+    return t.strftime("%Y-%m-%d %H:%M")
+
+
+def pairwise(appts):
+    """{(staff, {id, id}): (from, to)} by checking every pair."""
+    found = {}
+    assigned = [a for a in appts if a["staff"] != "Not Assigned"]
+    for i, a in enumerate(assigned):
+        for b in assigned[i + 1:]:
+            if a["staff"] != b["staff"]:
+                continue
+            (a0, a1), (b0, b1) = span(a), span(b)
+            if a0 < b1 and b0 < a1:
+                found[(a["staff"], frozenset((str(a["id"]), str(b["id"]))))] = (stamp(max(a0, b0)), stamp(min(a1, b1)))
+    return found
+
+
+def test_overlaps_match_a_pairwise_check():
+    rng = random.Random(17)
+    for count in (0, 1, 40, 400):
+        appts = random_appointments(rng, count)
+        result = BDUI.audit_bookings(appts)
+        got = {(staff, frozenset((x, y))): (start, end) for staff, x, y, start, end in result["overlaps"]}
+        assert len(got) == len(result["overlaps"])   # each pair reported once
+        assert got == pairwise(appts)
+        assert result["checked"] == sum(a["staff"] != "Not Assigned" for a in appts)
+
+
+def test_over_capacity_periods_cover_the_overlaps():
+    rng = random.Random(23)
+    appts = random_appointments(rng, 300)
+    result = BDUI.audit_bookings(appts)
+    periods = {}
+    for staff, start, end, peak in result["over_capacity"]:
+        assert start < end and peak > BDUI.STAFF_CAPACITY
+        periods.setdefault(staff, []).append((start, end, peak))
+    # merging the pairwise overlap windows gives the same periods
+    merged = {}
+    for (staff, _), window in sorted(pairwise(appts).items(), key=lambda kv: (kv[0][0], kv[1])):
+        runs = merged.setdefault(staff, [])
+        if runs and window[0] < runs[-1][1]:
+            runs[-1][1] = max(runs[-1][1], window[1])
+        else:
+            runs.append(list(window))
+    assert {s: [(a, b) for a, b, _ in p] for s, p in periods.items()} == {s: [tuple(r) for r in runs] for s, runs in merged.items()}
+    # and the peak is the most bookings running at once inside each period
+    for staff, runs in periods.items():
+        mine = [span(a) for a in appts if a["staff"] == staff]
+        for start, end, peak in runs:
+            starts = [s for s, _ in mine if start <= stamp(s) < end] + [datetime.datetime.fromisoformat(start)]
+            assert peak == max(sum(s0 <= t < s1 for s0, s1 in mine) for t in starts)
+
+
+def test_back_to_back_bookings_do_not_overlap():
+    first = {"id": 1, "name": "A", "services": ["Haircut"], "date": "2025-11-03", "time": "10:00", "staff": "Asha"}
+    end = span(first)[1].strftime("%H:%M")
+    second = dict(first, id=2, name="B", time=end)
+    result = BDUI.audit_bookings([first, second])
+    assert result["overlaps"] == [] and result["over_capacity"] == []
+    third = dict(first, id=3, name="C", time="10:05")
+    result = BDUI.audit_bookings([first, second, third])
+    assert {(o[1], o[2]) for o in result["overlaps"]} == {("1", "3"), ("3", "2")}
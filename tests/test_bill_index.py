@@ -0,0 +1,125 @@
+import datetime
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import BDUI
+
+STAFF = ["Asha", "Rohit", "Meena"]
+SERVICES = ["Haircut", "Facial", "Manicure", "Massage"]
+FILTERS = [
+    {},
+    {"staff": "Asha"},
+    {"service": "Facial"},
+    {"staff": "Rohit", "service": "Haircut"},
+    {"min_final": 150},
+    {"max_final": 99.5},
+    {"min_final": 100, "max_final": 300},
+    {"staff": "Meena", "min_final": 250, "max_final": 2500},
+    {"staff": "Nobody"},
+]
+
+
+def random_bills(rng, first_id, count, months):
+    rows = []
+    for i in range(first_id, first_id + count):
+        services = ";".join(rng.sample(SERVICES, rng.randint(1, 3)))
+        final = "" if i % 41 == 0 else round(rng.uniform(0, 3000), 2)
+        date = f"{rng.choice(months)}-{rng.randint(1, 28):02d}"
+        rows.append([i, f"Client, {i}", rng.choice(STAFF), services, 0, 0, final, date])
+    return rows
+
+
+def brute_force(filters):
+    """(count, total, rows newest first) by reading every bill."""
+    lo = filters.get("min_final", float("-inf"))
+    hi = filters.get("max_final", float("inf"))
+    hits = []
+    for row in BDUI.iter_bill_rows():
+        try:
+            final = float(row["Final"])
+        except ValueError:
+            final = None
+        services = {s.strip() for s in row["Services"].split(";")}
+        if "staff" in filters and row["Staff"] != filters["staff"]:
+            continue
+        if "service" in filters and filters["service"] not in services:
+            continue
+        if ("min_final" in filters or "max_final" in filters) and (final is None or not lo <= final <= hi):
+            continue
+        hits.append(([row[h] for h in BDUI.BILL_HEADERS], final or 0.0))
+    hits.reverse()
+    return len(hits), sum(f for _, f in hits), [r for r, _ in hits]
+
+
+def check(index):
+    for filters in FILTERS:
+        bitmap = index.match(**filters)
+        count, total, rows = brute_force(filters)
+        assert bitmap.bit_count() == count, filters
+        assert index.total(bitmap) == pytest.approx(total), filters
+        assert index.fetch(bitmap, limit=10 ** 6) == rows, filters
+        assert index.fetch(bitmap, limit=5) == rows[:5], filters
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(BDUI, "_bill_index", None)
+    return random.Random(7)
+
+
+def test_queries_match_brute_force(ledger):
+    BDUI.append_bill_rows(random_bills(ledger, 1, 600, ["2025-01", "2025-02"]))
+    index = BDUI.BillIndex()
+    index.build()
+    check(index)
+    assert index.match(month="2025-02").bit_count() == sum(
+        1 for row in BDUI.iter_bill_rows() if row["Date"].startswith("2025-02"))
+
+
+def test_incremental_sync_matches_a_rebuild(ledger):
+    today = datetime.date.today()
+    BDUI.append_bill_rows(random_bills(ledger, 1, 400, ["2024-03", "2024-04"]))
+    assert BDUI.archive_closed_months() > 0   # 2024 months now live in archive segments
+    BDUI.append_bill_rows(random_bills(ledger, 401, 300, [today.strftime("%Y-%m")]))
+    index = BDUI.BillIndex()
+    index.build()
+    assert index.segments
+    for first_id in (701, 751, 1001):
+        BDUI.append_bill_rows(random_bills(ledger, first_id, 50 if first_id < 1001 else 1, [today.strftime("%Y-%m")]))
+        assert index.sync()
+        rebuilt = BDUI.BillIndex()
+        rebuilt.build()
+        assert index.rows == rebuilt.rows
+        assert index.bitmaps == rebuilt.bitmaps
+        check(index)
+    assert not index.sync()
+
+
+def test_rewritten_ledger_is_reindexed(ledger):
+    rows = random_bills(ledger, 1, 200, ["2025-05"])
+    BDUI.append_bill_rows(rows)
+    index = BDUI.BillIndex()
+    index.build()
+    os.remove(BDUI.BILL_FILE)
+    BDUI.append_bill_rows(rows[:150])
+    assert index.sync()
+    assert index.rows == 150
+    check(index)
+
+
+def test_saved_index_loads_back(ledger):
+    BDUI.append_bill_rows(random_bills(ledger, 1, 300, ["2025-06"]))
+    index = BDUI.BillIndex()
+    index.build()
+    BDUI._write_bill_index(dict(index.__dict__, amounts=index.amounts.tobytes(),
+                                hot_offsets=index.hot_offsets.tobytes()), BDUI._bill_index_saves[0] + 1)
+    loaded = BDUI.BillIndex.load()
+    assert loaded.bitmaps == index.bitmaps
+    assert list(loaded.amounts) == list(index.amounts)
+    check(loaded)
@@ -0,0 +1,112 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import BDUI
+
+np = pytest.importorskip("numpy")
+
+STAFF = ["Asha", "Rohit", "Meena", "Komal"]
+SERVICES = ["Haircut", "Facial", "Manicure", "Massage", "Hair Coloring"]
+MONTHS = ["2025-10", "2025-11"]
+
+
+def random_appointment(rng, appt_id):
+    month = rng.choice(MONTHS)
+    return {"id": appt_id, "name": f"C{appt_id}", "services": rng.sample(SERVICES, rng.randint(1, 3)),
+            "date": f"{month}-{rng.randint(1, 28):02d}", "time": f"{rng.randint(8, 23):02d}:{rng.choice([0, 10, 25, 45]):02d}",
+            "staff": rng.choice(STAFF)}
+
+
+def cells(cube, month):
+    """{(day, slot, staff, service): minutes} for the non-empty cells, by name."""
+    array = cube.month(month)
+    return {(d, s, cube.staff[st], cube.services[sv]): int(array[d, s, st, sv])
+            for d, s, st, sv in zip(*np.nonzero(array))}
+
+
+@pytest.fixture
+def booked(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(5)
+    monkeypatch.setattr(BDUI, "Appointments", [random_appointment(rng, i) for i in range(1, 301)])
+    return rng
+
+
+def test_cells_cover_every_minute(booked):
+    cube = BDUI.OccupancyCube()
+    total = sum(sum(BDUI.service_duration.get(s, 30) for s in a["services"]) for a in BDUI.Appointments)
+    # minutes running past midnight are not counted
+    clipped = sum(max(BDUI.time_to_minutes(a["time"]) + BDUI.total_time(a["services"]) - 24 * 60, 0)
+                  for a in BDUI.Appointments)
+    assert sum(int(cube.month(m).sum(dtype=np.int64)) for m in MONTHS) == total - clipped
+
+
+def test_incremental_updates_match_a_rebuild(booked):
+    rng = booked
+    cube = BDUI.OccupancyCube()
+    for month in MONTHS:
+        cube.month(month)
+    next_id = 301
+    for step in range(300):
+        roll = rng.random()
+        if roll < 0.35:
+            appt = random_appointment(rng, next_id)
+            next_id += 1
+            BDUI.Appointments.append(appt)
+            cube.on_added(appt)
+        elif roll < 0.7:
+            i = rng.randrange(len(BDUI.Appointments))
+            moved = dict(random_appointment(rng, BDUI.Appointments[i]["id"]), name=BDUI.Appointments[i]["name"])
+            BDUI.Appointments[i] = moved
+            cube.on_updated(moved)
+        else:
+            cube.on_removed(BDUI.Appointments.pop(rng.randrange(len(BDUI.Appointments))))
+        if step % 50 == 49:
+            rebuilt = BDUI.OccupancyCube()
+            for month in MONTHS:
+                assert cells(cube, month) == cells(rebuilt, month), (step, month)
+
+
+def test_overlapping_bookings_add_up_and_come_off_again(booked, monkeypatch):
+    monkeypatch.setattr(BDUI, "Appointments", [])
+    cube = BDUI.OccupancyCube()
+    cube.month("2025-11")
+    first = {"id": 1, "name": "A", "services": ["Haircut"], "date": "2025-11-03", "time": "10:05", "staff": "Asha"}
+    second = dict(first, id=2, name="B")
+    for appt in (first, second):
+        BDUI.Appointments.append(appt)
+        cube.on_added(appt)
+    slot = (10 * 60 + 5) // BDUI.SLOT_MINUTES
+    haircut = cube.service_pos["Haircut"]
+    asha = cube.staff_pos["Asha"]
+    assert cube.month("2025-11")[2, slot, asha, haircut] == 2 * (BDUI.SLOT_MINUTES - 5)
+    cube.on_removed(BDUI.Appointments.pop())
+    cube.on_removed(BDUI.Appointments.pop())
+    assert not cube.month("2025-11").any()
+
+
+def test_reload_rebuilds_from_the_appointments(booked):
+    cube = BDUI.OccupancyCube()
+    assert cells(cube, MONTHS[0])
+    BDUI.Appointments.pop()
+    cube.on_reloaded()
+    assert cells(cube, MONTHS[0]) == cells(BDUI.OccupancyCube(), MONTHS[0])
+    assert cube.booked is not None and len(cube.booked) == len(BDUI.Appointments)
+
+
+def test_archived_month_matches_the_appointments_it_came_from(booked, monkeypatch):
+    old = [dict(random_appointment(booked, 1000 + i), date=f"2024-03-{booked.randint(1, 28):02d}") for i in range(200)]
+    expected = BDUI.OccupancyCube()
+    monkeypatch.setattr(BDUI, "Appointments", list(old))
+    want = cells(expected, "2024-03")
+    BDUI.save_appointments()
+    assert BDUI.archive_closed_months() > 0
+    assert not [a for a in BDUI.Appointments if a["date"].startswith("2024-03")]
+    assert cells(BDUI.OccupancyCube(), "2024-03") == want
+    assert os.path.exists(BDUI._occupancy_path("2024-03"))
+    assert cells(BDUI.OccupancyCube(), "2024-03") == want   # from the cached part this time
@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import BDUI
+
+
+def write_bills(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(",".join(BDUI.BILL_HEADERS) + "\n")
+        for r in rows:
+            f.write(",".join(str(v) for v in r) + "\n")
+
+
+def test_unparseable_typed_value_keeps_rows_aligned(tmp_path):
+    path = str(tmp_path / "bills.csv")
+    write_bills(path, [
+        (1, "A", "Asha", "Haircut", 80, 0, 80.0, "2025-01-01"),
+        (2, "B", "Asha", "Facial", 200, 0, "", "2025-01-01"),
+        (3, "C", "Meena", "Manicure", 400, 0, 400.0, "2025-01-02"),
+        (4, "D", "Rohit", "Shaving", 150, 0, 150.0, "2025-01-02"),
+    ])
+    rows = list(BDUI.scan_csv(path, ["ID", "Staff", "Final", "Date"], {"Final": float}))
+    assert rows == [
+        ("1", "Asha", 80.0, "2025-01-01"),
+        ("2", "Asha", None, "2025-01-01"),
+        ("3", "Meena", 400.0, "2025-01-02"),
+        ("4", "Rohit", 150.0, "2025-01-02"),
+    ]
+
+
+def test_rows_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(BDUI, "SCAN_CHUNK", 256)
+    path = str(tmp_path / "bills.csv")
+    rows = [(i, f"C{i}", f"S{i % 7}", "Haircut", 80, 0, "bad" if i % 97 == 0 else float(i), "2025-01-01")
+            for i in range(1, 2001)]
+    write_bills(path, rows)
+    assert os.path.getsize(path) > 10 * BDUI.SCAN_CHUNK
+    got = list(BDUI.scan_csv(path, ["ID", "Staff", "Final"], {"ID": int, "Final": float}))
+    assert got == [(i, f"S{i % 7}", None if i % 97 == 0 else float(i)) for i in range(1, 2001)]
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import BDUI
+
+PEER_A = "a" * 32
+PEER_B = "b" * 32
+
+
+@pytest.fixture
+def terminal(tmp_path, monkeypatch):
+    """A fresh data folder with sync enabled as terminal 1 and one booking, id 7."""
+    monkeypatch.chdir(tmp_path)
+    with open("staff.csv", "w", encoding="utf-8") as f:
+        f.write('Name,Specialization,Salary\nAsha,"Haircut, Shaving",15000\n')
+    with open("appointments.csv", "w", encoding="utf-8") as f:
+        f.write("ID,Name,Services,Date,Time,Staff\n7,Riya,Haircut,2025-11-21,10:00,Asha\n")
+    for name, value in [("Appointments", []), ("staffNames", []), ("staffSpecs", []), ("staffSalaries", []),
+                        ("_sync_state", None), ("_sync_index", None), ("_sync_seen", None)]:
+        monkeypatch.setattr(BDUI, name, value)
+    BDUI.load_staff()
+    BDUI.load_appointments()
+    BDUI.enable_sync(1)
+    return BDUI.sync_state()
+
+
+def booking(name, clock, origin, seq, op="put"):
+    data = None if op == "delete" else {"id": 7, "name": name, "services": ["Haircut"],
+                                        "date": "2025-11-21", "time": "10:00", "staff": "Asha"}
+    return {"origin": origin, "seq": seq, "clock": clock, "kind": "appointment", "key": "7", "op": op, "data": data}
+
+
+def names():
+    return [a["name"] for a in BDUI.Appointments]
+
+
+def test_later_clock_wins_whatever_the_arrival_order(terminal):
+    BDUI.apply_remote_changes([booking("Newer", 9, PEER_A, 1)])
+    BDUI.apply_remote_changes([booking("Older", 5, PEER_B, 1)])
+    assert names() == ["Newer"]
+    BDUI.apply_remote_changes([booking("Newest", 10, PEER_B, 2)])
+    assert names() == ["Newest"]
+
+
+@pytest.mark.parametrize("first", [PEER_A, PEER_B])
+def test_equal_clocks_are_broken_by_origin(terminal, first):
+    changes = {PEER_A: booking("From A", 50, PEER_A, 1), PEER_B: booking("From B", 50, PEER_B, 1)}
+    second = PEER_B if first == PEER_A else PEER_A
+    BDUI.apply_remote_changes([changes[first]])
+    BDUI.apply_remote_changes([changes[second]])
+    assert names() == ["From B"]
+
+
+def test_delete_and_update_follow_the_clock(terminal):
+    BDUI.apply_remote_changes([booking("Edited", 20, PEER_A, 1), booking(None, 30, PEER_B, 1, "delete")])
+    assert names() == []
+    BDUI.apply_remote_changes([booking("Late edit", 25, PEER_A, 2)])
+    assert names() == []
+    BDUI.apply_remote_changes([booking("Rebooked", 40, PEER_A, 3)])
+    assert names() == ["Rebooked"]
+    with open("appointments.csv", encoding="utf-8") as f:
+        assert "Rebooked" in f.read()
+
+
+def test_reapplying_changes_is_a_no_op(terminal):
+    batch = [booking("Edited", 20, PEER_A, 1), booking("Edited again", 21, PEER_A, 2)]
+    assert BDUI.apply_remote_changes(batch) == 2
+    vector = BDUI.sync_vector()
+    assert BDUI.apply_remote_changes(batch) == 0
+    assert BDUI.apply_remote_changes(batch[1:]) == 0
+    assert BDUI.sync_vector() == vector
+    assert names() == ["Edited again"]
+
+
+def test_out_of_order_seq_waits_for_the_gap(terminal):
+    assert BDUI.apply_remote_changes([booking("Second", 21, PEER_A, 2)]) == 0
+    assert names() == ["Riya"]
+    assert BDUI.apply_remote_changes([booking("First", 20, PEER_A, 1), booking("Second", 21, PEER_A, 2)]) == 2
+    assert names() == ["Second"]
+
+
+def test_versions_rebuilt_from_the_logs(terminal, monkeypatch):
+    monkeypatch.setattr(BDUI, "SYNC_CHECKPOINT_CHANGES", 2)
+    BDUI.apply_remote_changes([booking("Edited", 20, PEER_A, 1), booking(None, 30, PEER_B, 1, "delete")])
+    BDUI.apply_remote_changes([booking("Late edit", 25, PEER_A, 2)])
+    live = BDUI._sync_versions()
+    monkeypatch.setattr(BDUI, "_sync_index", None)
+    rebuilt = BDUI._sync_versions()
+    assert os.path.exists(os.path.join(BDUI.SYNC_DIR, "versions.snap"))
+    assert (rebuilt["vector"], rebuilt["clock"], rebuilt["versions"]) == (live["vector"], live["clock"], live["versions"])
+    assert rebuilt["versions"]["appointment:7"] == [30, PEER_B]
@@ -0,0 +1,109 @@
+import datetime
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import BDUI
+
+NOW = datetime.datetime(2025, 11, 21, 10, 0)
+SERVICES = [["Haircut"], ["Shaving"], ["Haircut", "Shaving"], ["Facial"], ["Haircut", "Facial"], ["Massage"]]
+
+
+def test_fenwick_prefix_sums_after_changes():
+    rng = random.Random(3)
+    tree, values = BDUI._Fenwick(), []
+    for step in range(500):
+        if values and rng.random() < 0.4:
+            i = rng.randrange(len(values))
+            delta = -values[i] if rng.random() < 0.5 else rng.randint(1, 20)
+            tree.add(i + 1, delta)
+            values[i] += delta
+        else:
+            values.append(rng.randint(0, 120))
+            assert tree.append(values[-1]) == len(values)
+        assert tree.total == sum(values)
+        for i in (0, len(values) // 3, len(values) // 2, len(values)):
+            assert tree.prefix(i) == sum(values[:i]), (step, i)
+
+
+@pytest.fixture
+def salon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(BDUI, "staffNames", ["Asha", "Rohit", "Meena"])
+    # only Rohit does facials, only Meena does massages
+    monkeypatch.setattr(BDUI, "staffSpecs", ["Haircut, Shaving", "Haircut, Facial", "Haircut, Shaving, Massage"])
+    monkeypatch.setattr(BDUI, "staffSalaries", ["15000", "18000", "16000"])
+    monkeypatch.setattr(BDUI, "Appointments", [])
+    return BDUI.WalkInQueue()
+
+
+def brute_force_wait(queue, ticket, now):
+    """Remaining service time plus every ticket queued ahead of this one."""
+    q = queue.queues[ticket["staff"]]
+    ahead = 0
+    for other in queue.waiting(ticket["staff"]):
+        if other is ticket:
+            return q.remaining(now) + ahead
+        ahead += other["minutes"]
+    raise AssertionError("ticket is not queued")
+
+
+def check_waits(queue, now):
+    waiting = [t for t in queue.tickets.values() if t["state"] == "waiting"]
+    for t in waiting:
+        assert queue.estimated_wait(t, now) == brute_force_wait(queue, t, now), t["name"]
+    for t in queue.tickets.values():
+        if t["state"] != "waiting":
+            assert queue.estimated_wait(t, now) == 0
+    return waiting
+
+
+def test_waits_after_leaving_and_starting(salon):
+    rng = random.Random(11)
+    now = NOW
+    for i in range(60):
+        salon.join(f"W{i}", rng.choice(SERVICES), level=rng.randrange(len(BDUI.WALKIN_LEVELS)), now=now)
+    check_waits(salon, now)
+    for step in range(80):
+        now += datetime.timedelta(minutes=rng.randint(1, 15))
+        waiting = [t for t in salon.tickets.values() if t["state"] == "waiting"]
+        roll = rng.random()
+        if roll < 0.4 and waiting:
+            salon.leave(rng.choice(waiting)["id"])
+        elif roll < 0.8:
+            staff = rng.choice(BDUI.staffNames)
+            salon.finish(staff, now)
+            salon.start_next(staff, now)
+        else:
+            salon.join(f"Late{step}", rng.choice(SERVICES), level=rng.randrange(len(BDUI.WALKIN_LEVELS)), now=now)
+        check_waits(salon, now)
+
+
+def test_priority_goes_ahead_of_normal(salon):
+    normal = salon.join("Normal", ["Facial"], level=1, now=NOW)
+    priority = salon.join("Priority", ["Facial"], level=0, now=NOW)
+    assert priority["staff"] == normal["staff"] == "Rohit"
+    assert salon.waiting("Rohit") == [priority, normal]
+    assert salon.estimated_wait(priority, NOW) == 0
+    assert salon.estimated_wait(normal, NOW) == priority["minutes"]
+    salon.leave(priority["id"])
+    assert salon.estimated_wait(normal, NOW) == 0
+    assert salon.waiting(normal["staff"]) == [normal]
+
+
+def test_start_next_books_and_counts_remaining_time(salon):
+    first = salon.join("First", ["Massage"], now=NOW)
+    second = salon.join("Second", ["Massage"], now=NOW)
+    staff = "Meena"
+    assert salon.estimated_wait(second, NOW) == first["minutes"]
+    assert salon.start_next(staff, NOW) is first
+    assert first["appointment"]["staff"] == staff
+    assert [a["name"] for a in BDUI.Appointments] == ["First"]
+    later = NOW + datetime.timedelta(minutes=5)
+    assert salon.estimated_wait(second, later) == first["minutes"] - 5
+    with pytest.raises(ValueError):
+        salon.start_next(staff, later)